@@ -0,0 +1,66 @@
+# Benchmark: vectorized NumPy distance matrix vs. the original double Python loop
+#
+# Usage:
+#   python benchmarks/bench_distance_matrix.py
+#   python benchmarks/bench_distance_matrix.py --sizes 100 1000 10000 --loop-limit 1000 --chunk-size 2048
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soda
+
+
+# The original implementation: one haversine() call per pair of locations
+def loop_distance_matrix(lats, lons):
+    n = len(lats)
+    distance_matrix = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            distance = soda.haversine(lats[i], lons[i], lats[j], lons[j])
+            distance_matrix[i, j] = distance
+            distance_matrix[j, i] = distance
+    return distance_matrix
+
+
+# Random store locations scattered around the home in soda.coordinates
+def random_locations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    home_lat, home_lon = soda.coordinates['Home']
+    return home_lat + rng.uniform(-1.0, 1.0, n), home_lon + rng.uniform(-1.0, 1.0, n)
+
+
+# Run fn once and return (seconds, result)
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the loop and NumPy distance matrix builders.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000, 8000], help="number of locations n")
+    parser.add_argument('--loop-limit', type=int, default=500, help="skip the Python loop for n above this")
+    parser.add_argument('--chunk-size', type=int, default=1024, help="rows per block in the chunked float32 run")
+    args = parser.parse_args()
+
+    print(f"{'n':>8} {'loop (s)':>10} {'numpy (s)':>10} {'chunked f32 (s)':>16} {'speedup':>10} {'max |diff| mi':>14}")
+    for n in args.sizes:
+        lats, lons = random_locations(n)
+        numpy_seconds, full = timed(soda.calculate_distance_matrix_np, lats, lons)
+        chunked_seconds, chunked = timed(soda.calculate_distance_matrix_np, lats, lons, chunk_size=args.chunk_size, dtype=np.float32)
+        max_diff = float(np.max(np.abs(full - chunked)))
+        if n > args.loop_limit:
+            print(f"{n:>8} {'-':>10} {numpy_seconds:>10.4f} {chunked_seconds:>16.4f} {'-':>10} {max_diff:>14.2e}")
+            continue
+        loop_seconds, looped = timed(loop_distance_matrix, lats, lons)
+        max_diff = max(max_diff, float(np.max(np.abs(full - looped))))
+        print(f"{n:>8} {loop_seconds:>10.4f} {numpy_seconds:>10.4f} {chunked_seconds:>16.4f} {loop_seconds / numpy_seconds:>9.0f}x {max_diff:>14.2e}")
+
+
+if __name__ == '__main__':
+    main()
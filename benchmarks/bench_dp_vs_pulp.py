@@ -0,0 +1,42 @@
+# Benchmark: dynamic-programming solver vs. PuLP/CBC for the package mix
+#
+# Usage:
+#   python benchmarks/bench_dp_vs_pulp.py
+#   python benchmarks/bench_dp_vs_pulp.py --sizes 10 100 1000 --pulp-limit 1000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soda
+
+
+# Time one solver over the quantities 1..max_sodas and return (seconds, plans)
+def time_solver(solver, max_sodas):
+    start = time.perf_counter()
+    plans = soda.get_optimal_shopping_plans(range(1, max_sodas + 1), solver=solver)
+    return time.perf_counter() - start, plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the DP and PuLP solvers across soda quantities.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000], help="largest quantity N of each run")
+    parser.add_argument('--pulp-limit', type=int, default=1000, help="skip PuLP for N above this (it solves one MILP per quantity)")
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'dp (s)':>10} {'pulp (s)':>10} {'speedup':>10} {'max |diff|':>12}")
+    for max_sodas in args.sizes:
+        dp_seconds, dp_plans = time_solver('dp', max_sodas)
+        if max_sodas > args.pulp_limit:
+            print(f"{max_sodas:>8} {dp_seconds:>10.4f} {'-':>10} {'-':>10} {'-':>12}")
+            continue
+        pulp_seconds, pulp_plans = time_solver('pulp', max_sodas)
+        # Both solvers must agree on the optimum for every quantity
+        max_diff = max(abs(a['objective'] - b['objective']) for a, b in zip(dp_plans, pulp_plans))
+        print(f"{max_sodas:>8} {dp_seconds:>10.4f} {pulp_seconds:>10.4f} {pulp_seconds / dp_seconds:>9.0f}x {max_diff:>12.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Load test: concurrent requests against the HTTP optimization service
+#
+# Usage:
+#   python benchmarks/bench_service.py
+#   python benchmarks/bench_service.py --requests 2000 --concurrency 100 --distinct 20 --workers 4
+#   python benchmarks/bench_service.py --url http://127.0.0.1:8080   (an already running `python -m soda serve`)
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soda
+
+
+# Send one GET over an open keep-alive connection and return the decoded JSON body
+async def get(reader, writer, host, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    await writer.drain()
+    status = (await reader.readline()).decode().split()[1]
+    length = 0
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    body = json.loads(await reader.readexactly(length))
+    if status != '200':
+        raise RuntimeError(body)
+    return body
+
+
+# One client: a keep-alive connection that sends its share of the requests one after another
+async def client(host, port, paths, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for path in paths:
+        start = time.perf_counter()
+        await get(reader, writer, host, path)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+# A mix of requests: `distinct` different questions, each asked many times
+def request_paths(total, distinct, seed=0):
+    rng = random.Random(seed)
+    home_lat, home_lon = soda.coordinates['Home']
+    questions = [f'/optimize?demand={rng.randint(1, 200)}&lat={home_lat + rng.uniform(-0.05, 0.05):.5f}'
+                 f'&lon={home_lon + rng.uniform(-0.05, 0.05):.5f}' for _ in range(distinct)]
+    return [rng.choice(questions) for _ in range(total)]
+
+
+async def run(args):
+    server = service = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        server, service = await soda.start_service('127.0.0.1', 0, workers=args.workers, ttl=args.ttl)
+        host, port = server.sockets[0].getsockname()[:2]
+
+    paths = request_paths(args.requests, args.distinct)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, paths[i::args.concurrency], latencies) for i in range(args.concurrency)))
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    stats = await get(reader, writer, host, '/stats')
+    writer.close()
+    await writer.wait_closed()
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+        service['pool'].shutdown()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{'requests':>10} {'seconds':>10} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print(f"{len(latencies):>10} {seconds:>10.3f} {len(latencies) / seconds:>10.0f} {p50 * 1000:>10.2f} {p99 * 1000:>10.2f}")
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HTTP optimization service.")
+    parser.add_argument('--url', help="target a running service instead of starting one in-process")
+    parser.add_argument('--requests', type=int, default=1000, help="total number of requests")
+    parser.add_argument('--concurrency', type=int, default=50, help="number of concurrent keep-alive clients")
+    parser.add_argument('--distinct', type=int, default=10, help="number of different questions in the mix")
+    parser.add_argument('--workers', type=int, help="solver processes for the in-process service")
+    parser.add_argument('--ttl', type=float, default=60.0, help="result cache lifetime for the in-process service")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# Benchmark suite: time and peak memory of every pipeline stage on synthetic catalogs, compared to a saved baseline
+#
+# Usage:
+#   python benchmarks/bench_suite.py --output results.json
+#   python benchmarks/bench_suite.py --cases 10:1 1000:100 100000:10 --output results.json --baseline baseline.json
+#   python benchmarks/bench_suite.py --quick --baseline baseline.json --tolerance 0.5
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soda
+from synthetic_catalog import generate_catalog
+
+
+# Catalog shapes as stores:skus_per_store, from the size of the built-in data up to a large chain feed
+DEFAULT_CASES = ['10:1', '10:10', '1000:10', '1000:100', '10000:100', '1000:1000', '100000:10']
+QUICK_CASES = ['10:1', '100:10', '1000:20']
+# Stages timed in every case, in pipeline order
+STAGES = ['catalog', 'cost_table', 'distance_matrix', 'milp', 'routing']
+
+
+# Run fn once and return (seconds, result)
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+# Run fn `repeat` times for the best time, then once more under tracemalloc for the peak memory
+def measure(fn, repeat, memory=True):
+    seconds = min(timed(fn)[0] for _ in range(repeat))
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak_mb}
+
+
+# Time every stage for one catalog shape
+def run_case(num_stores, skus_per_store, args):
+    results = {'stores': num_stores, 'skus': skus_per_store, 'rows': num_stores * skus_per_store, 'stages': {}}
+    stages = results['stages']
+
+    stages['catalog'] = measure(lambda: generate_catalog(num_stores, skus_per_store, seed=args.seed), 1, args.memory)
+    catalog = generate_catalog(num_stores, skus_per_store, seed=args.seed)
+    soda.set_catalog(catalog)
+    k_nearest = min(args.k_nearest, num_stores)
+
+    # Cost table, including the spatial index query that picks the candidate stores
+    def cost_table():
+        soda.invalidate_cost_table()
+        return soda.build_cost_table(k_nearest=k_nearest)
+    stages['cost_table'] = measure(cost_table, args.repeat, args.memory)
+
+    # Store-to-store distance matrix, capped so that the largest cases still fit in memory
+    n = min(num_stores, args.matrix_limit)
+    lats, lons = catalog['store_lat'][:n], catalog['store_lon'][:n]
+    stages['distance_matrix'] = measure(lambda: soda.calculate_distance_matrix_np(lats, lons, chunk_size=1024, dtype=np.float32),
+                                        args.repeat, args.memory)
+    stages['distance_matrix']['n'] = n
+
+    # MILP build and CBC solve on the candidate stores (the cost table itself comes from the cache)
+    soda.get_cost_table(k_nearest=k_nearest)
+    def milp():
+        return soda.get_optimal_shopping_plans([args.demand], solver='pulp', k_nearest=k_nearest)[0]
+    stages['milp'] = measure(milp, args.repeat, args.memory)
+    stages['milp']['status'] = milp()['status']
+
+    # Route through the nearest stores from home, solved from scratch every time
+    stops = min(args.route_stops, num_stores)
+    home = soda.coordinates['Home']
+    index = soda.get_store_index()
+    nearest = index['store_ids'][soda.query_nearest(index, home[0], home[1], stops)[0]]
+    D = soda.calculate_distance_matrix_np(np.r_[home[0], catalog['store_lat'][nearest]],
+                                          np.r_[home[1], catalog['store_lon'][nearest]])
+    stages['routing'] = measure(lambda: soda.solve_route(D), args.repeat, args.memory)
+    stages['routing']['stops'] = stops
+    stages['routing']['backend'] = soda.solve_route(D)['backend']
+
+    soda.set_catalog(None)
+    soda.invalidate_cost_table()
+    return results
+
+
+# Compare results to a baseline and return the stages that got slower or bigger than the tolerance allows
+def compare(results, baseline, tolerance, memory_tolerance, min_seconds):
+    base_cases = {(case['stores'], case['skus']): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        base = base_cases.get((case['stores'], case['skus']))
+        if base is None:
+            continue
+        for stage, now in case['stages'].items():
+            before = base['stages'].get(stage)
+            if before is None:
+                continue
+            # Tiny timings are mostly noise, so a stage must also be slower by min_seconds in absolute terms
+            if now['seconds'] > before['seconds'] * (1 + tolerance) and now['seconds'] - before['seconds'] > min_seconds:
+                regressions.append((case['stores'], case['skus'], stage, 'seconds', before['seconds'], now['seconds']))
+            if now['peak_mb'] is not None and before['peak_mb'] is not None \
+                    and now['peak_mb'] > before['peak_mb'] * (1 + memory_tolerance) and now['peak_mb'] - before['peak_mb'] > 1:
+                regressions.append((case['stores'], case['skus'], stage, 'peak_mb', before['peak_mb'], now['peak_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic catalogs and compare to a baseline.")
+    parser.add_argument('--cases', nargs='+', help=f"catalog shapes as STORES:SKUS (default: {' '.join(DEFAULT_CASES)})")
+    parser.add_argument('--quick', action='store_true', help=f"run only the small cases {' '.join(QUICK_CASES)}")
+    parser.add_argument('--demand', type=int, default=100, help="number of sodas in the MILP stage")
+    parser.add_argument('--k-nearest', type=int, default=50, help="candidate stores kept by the cost table stage")
+    parser.add_argument('--matrix-limit', type=int, default=10000, help="largest distance matrix to build")
+    parser.add_argument('--route-stops', type=int, default=12, help="stores in the routing stage")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; the best time is kept")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the tracemalloc peak memory run")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the synthetic catalogs")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="compare against results saved earlier with --output")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown per stage")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="allowed relative peak memory growth per stage")
+    parser.add_argument('--min-seconds', type=float, default=0.005, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    cases = args.cases or (QUICK_CASES if args.quick else DEFAULT_CASES)
+    results = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(), 'cases': []}
+
+    # A throwaway run first, so lazy imports and the first CBC start are not charged to the first case
+    run_case(10, 1, argparse.Namespace(**{**vars(args), 'repeat': 1, 'memory': False}))
+
+    print(f"{'stores':>8} {'skus':>6} {'rows':>10} " + ' '.join(f'{stage + " (s)":>18}' for stage in STAGES)
+          + f" {'peak (MB)':>10}")
+    for case in cases:
+        num_stores, skus_per_store = (int(value) for value in case.split(':'))
+        result = run_case(num_stores, skus_per_store, args)
+        results['cases'].append(result)
+        peak = max((stage['peak_mb'] or 0) for stage in result['stages'].values())
+        print(f"{num_stores:>8} {skus_per_store:>6} {result['rows']:>10} "
+              + ' '.join(f"{result['stages'][stage]['seconds']:>18.4f}" for stage in STAGES) + f" {peak:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance, args.min_seconds)
+        for stores, skus, stage, metric, before, now in regressions:
+            print(f"REGRESSION {stores}:{skus} {stage} {metric}: {before:.4f} -> {now:.4f} ({now / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Synthetic catalogs for the benchmarks, shaped like prices / fluid_ounces / sodas_per_package / coordinates in soda.data
+#
+# Usage:
+#   python benchmarks/synthetic_catalog.py stores.csv --stores 10000 --skus 50
+#   (then: python -m soda optimize 30 --catalog stores.csv)
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import soda
+from soda.catalog import _make_catalog
+
+
+# Package formats that real stores sell: (units per package, fluid ounces per unit, container)
+PACK_SIZES = [
+    (1, 12, 'can'), (6, 7.5, 'can'), (10, 7.5, 'can'), (12, 12, 'can'), (24, 12, 'can'), (35, 12, 'can'),
+    (1, 20, 'plastic'), (1, 67.6, 'plastic'), (6, 16.9, 'plastic'), (8, 16.9, 'plastic'),
+    (4, 12, 'glass'), (24, 12, 'glass'),
+]
+# Typical price per fluid ounce of each container type, before store and bulk discounts
+PRICE_PER_OUNCE = {'can': 0.03, 'plastic': 0.035, 'glass': 0.06}
+
+
+# Function to generate a columnar catalog with num_stores stores carrying skus_per_store items each
+def generate_catalog(num_stores, skus_per_store, seed=0, spread_degrees=1.0):
+    rng = np.random.default_rng(seed)
+    # The SKU universe is twice what one store carries, so stores overlap but are not identical
+    num_skus = max(2 * skus_per_store, len(PACK_SIZES))
+    sku_pack = np.arange(num_skus) % len(PACK_SIZES)
+    container_names = sorted(PRICE_PER_OUNCE)
+    units = np.array([pack[0] for pack in PACK_SIZES], dtype=float)[sku_pack]
+    ounces = np.array([pack[0] * pack[1] for pack in PACK_SIZES], dtype=float)[sku_pack]
+    container = np.array([container_names.index(pack[2]) for pack in PACK_SIZES], dtype=np.int8)[sku_pack]
+    # Bigger packages are cheaper per ounce, and every brand has its own price level
+    base_price = (ounces * np.array([PRICE_PER_OUNCE[name] for name in container_names])[container]
+                  * units ** -0.1 * rng.lognormal(0.0, 0.15, num_skus))
+
+    # Each store carries a random subset of the SKUs, drawn in blocks to bound the scratch memory
+    sku_id = np.empty(num_stores * skus_per_store, dtype=np.int32)
+    block = max(1, 10_000_000 // num_skus)
+    for start in range(0, num_stores, block):
+        stop = min(start + block, num_stores)
+        picks = np.argpartition(rng.random((stop - start, num_skus)), skus_per_store - 1, axis=1)[:, :skus_per_store]
+        sku_id[start * skus_per_store:stop * skus_per_store] = np.sort(picks, axis=1).ravel()
+    store_id = np.repeat(np.arange(num_stores, dtype=np.int32), skus_per_store)
+
+    # Store price levels and per-row noise, rounded to cents
+    store_factor = rng.lognormal(0.0, 0.1, num_stores)
+    price = np.round(base_price[sku_id] * store_factor[store_id] * rng.lognormal(0.0, 0.05, len(sku_id)), 2)
+
+    home_lat, home_lon = soda.coordinates['Home']
+    columns = {
+        'store_id': store_id,
+        'sku_id': sku_id,
+        'container_id': container[sku_id],
+        'price': np.maximum(price, 0.25),
+        'fluid_ounces': ounces[sku_id],
+        'sodas_per_package': units[sku_id],
+        'store_lat': home_lat + rng.uniform(-spread_degrees, spread_degrees, num_stores),
+        'store_lon': home_lon + rng.uniform(-spread_degrees, spread_degrees, num_stores),
+    }
+    names = {
+        'store_names': [f'Store{i:06d}' for i in range(num_stores)],
+        'sku_names': [f'brand{i // len(PACK_SIZES):04d}_{PACK_SIZES[p][1]}oz_{PACK_SIZES[p][2]}_{PACK_SIZES[p][0]}pack'
+                      for i, p in enumerate(sku_pack.tolist())],
+        'container_names': container_names,
+    }
+    return _make_catalog(columns, names)
+
+
+# Function to write a catalog as a CSV feed with the columns that load_catalog() reads
+def write_catalog_csv(catalog, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(soda.CATALOG_COLUMNS)
+        for s, k, c, price, ounces, units in zip(catalog['store_id'].tolist(), catalog['sku_id'].tolist(),
+                                                 catalog['container_id'].tolist(), catalog['price'].tolist(),
+                                                 catalog['fluid_ounces'].tolist(), catalog['sodas_per_package'].tolist()):
+            writer.writerow([catalog['store_names'][s], catalog['sku_names'][k], price, ounces, int(units),
+                             catalog['container_names'][c], catalog['store_lat'][s], catalog['store_lon'][s]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic catalog feed as CSV.")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--stores', type=int, default=1000, help="number of stores")
+    parser.add_argument('--skus', type=int, default=20, help="items carried by each store")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    write_catalog_csv(generate_catalog(args.stores, args.skus, seed=args.seed), args.output)
+
+
+if __name__ == '__main__':
+    main()
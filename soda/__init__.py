@@ -0,0 +1,41 @@
+# Find the best deals on sodas by optimizing prices, container types, travel costs and shipping options.
+#
+# Importing this package has no side effects: nothing is solved and nothing is asked until you call a function.
+# PuLP and OR-Tools are only imported when a solve actually needs them.
+#
+# Quick start:
+#   from soda import optimize
+#   plan = optimize(30)
+#   print(plan.to_dict())
+
+from .catalog import (CATALOG_COLUMNS, catalog_from_dicts, get_catalog, load_catalog, open_catalog_cache,
+                      save_catalog_cache, set_catalog)
+from .costs import (build_cost_table, calculate_cost_per_soda, get_cost_table, get_data_version, invalidate_cost_table,
+                    update_cost_table_rows)
+from .data import (container_preferences, container_types, coordinates, fluid_ounces, free_shipping_thresholds, prices,
+                   shipping_costs, sodas_per_package, travel_cost_per_mile)
+from .distance import (calculate_distance_matrix, calculate_distance_matrix_np, calculate_distances_from, haversine,
+                       haversine_np)
+from .fleet import FLEET_INSERTION_CANDIDATES, build_fleet_problem, read_orders, solve_fleet
+from .households import iter_household_jobs, run_household_jobs, solve_household
+from .pareto import build_pareto_frontier, load_frontier, query_frontier, save_frontier
+from .plan import Plan
+from .profiling import (annotate, clear_trace, disable_tracing, enable_tracing, export_trace, get_trace, run_profiled, span,
+                        trace_settings)
+from .report import get_optimal_shopping_plan
+from .roads import (ROAD_MATRIX_CACHE_FILES, ROAD_PAIR_CACHE_SIZE, dijkstra, get_road_graph, load_road_graph,
+                    road_distance_matrix, road_distances_from, set_road_graph, snap_to_roads, travel_distance_matrix,
+                    travel_distances_from)
+from .routing import (HELD_KARP_MAX_STOPS, clear_route_cache, configure_route_cache, load_route_cache, plan_route,
+                      route_cache_settings, route_cache_stats, route_distance, save_route_cache, solve_route,
+                      solve_route_held_karp, solve_route_heuristic, solve_route_ortools)
+from .service import (SERVICE_CACHE_MAX_ENTRIES, SERVICE_MODELS, handle_optimize, parse_optimize_request, run_service,
+                      start_service)
+from .solver import (build_dp_table, build_joint_model, build_shopping_model, extract_shopping_plan, get_optimal_shopping_plans, optimize,
+                     solve_from_dp_table, summarize_shopping_plan)
+from .spatial import (build_spatial_index, find_candidate_stores, get_store_index, query_nearest, query_radius,
+                      to_unit_vectors)
+from .stockup import build_stockup_model, period_price_matrix, plan_stock_up, read_period_prices, stock_up_to_dict
+from .streaming import apply_price_delta, diff_plans, iter_price_deltas, run_price_stream, start_price_stream
+from .writers import (PLAN_COLUMNS, PLAN_FORMATS, close_plan_writer, flush_plan_writer, open_plan_writer, plan_rows,
+                      render_plan_text, write_optimal_shopping_plans, write_plan, write_plans)
@@ -0,0 +1,239 @@
+import argparse
+import json
+import sys
+
+from .catalog import load_catalog, set_catalog
+from .data import container_preferences
+from .fleet import build_fleet_problem, read_orders, solve_fleet
+from .households import run_household_jobs
+from .pareto import build_pareto_frontier, load_frontier, query_frontier, save_frontier
+from .profiling import enable_tracing, export_trace, run_profiled
+from .report import get_optimal_shopping_plan
+from .roads import load_road_graph, set_road_graph
+from .service import run_service
+from .solver import optimize
+from .stockup import plan_stock_up, read_period_prices, stock_up_to_dict
+from .streaming import run_price_stream
+from .writers import write_optimal_shopping_plans
+
+
+# Function to add the options shared by the commands that solve plans
+def _add_solve_options(parser):
+    parser.add_argument('--catalog', help="catalog file to load (default: built-in prices)")
+    parser.add_argument('--radius-miles', type=float, help="only consider stores within this distance of home")
+    parser.add_argument('--k-nearest', type=int, help="only consider this many nearest stores to home")
+    parser.add_argument('--road-edges', help="road network edge list (u, v, miles[, oneway]) to measure travel by road")
+    parser.add_argument('--road-nodes', help="road network node list (node, lat, lon) that goes with --road-edges")
+
+
+# Function to load the catalog and road graph chosen on the command line
+def _load_inputs(args):
+    if args.catalog:
+        set_catalog(load_catalog(args.catalog))
+    if args.road_edges:
+        set_road_graph(load_road_graph(args.road_edges, args.road_nodes))
+
+
+# Function to read a --preference option such as glass=1
+def _parse_preference(text):
+    container, _, value = text.partition('=')
+    if container not in container_preferences:
+        raise argparse.ArgumentTypeError(f"unknown container {container!r} (use one of {', '.join(container_preferences)})")
+    return container, float(value)
+
+
+# Function to run the program from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m soda', description="Find the cheapest way to buy sodas.")
+    parser.add_argument('--trace', metavar='PATH', help="record how long each stage takes and write the spans to PATH")
+    parser.add_argument('--trace-format', choices=['json', 'chrome'], default='chrome',
+                        help="chrome opens in chrome://tracing or Perfetto; json is a plain list of spans")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile and print the hottest functions")
+    parser.add_argument('--profile-out', metavar='PATH', help="with --profile, also save the full profile to PATH")
+    commands = parser.add_subparsers(dest='command')
+
+    optimize_command = commands.add_parser('optimize', help="solve one plan and print it as JSON")
+    optimize_command.add_argument('demand', type=int, help="number of sodas to buy")
+    optimize_command.add_argument('--home', type=float, nargs=2, metavar=('LAT', 'LON'), help="home location (default: built-in 'Home')")
+    optimize_command.add_argument('--solver', choices=['auto', 'dp', 'pulp'], default='auto', help="optimization engine")
+    optimize_command.add_argument('--model', choices=['per_package', 'joint'], default='per_package',
+                                  help="joint charges each trip and shipping fee once instead of per package")
+    optimize_command.add_argument('--no-route', action='store_true', help="skip planning the driving route")
+    optimize_command.add_argument('--preference', type=_parse_preference, action='append', default=[], metavar='CONTAINER=VALUE',
+                                  help="override a container preference, e.g. glass=1 (can be repeated)")
+    optimize_command.add_argument('--frontier', help="answer from a frontier file saved by the frontier command instead of solving")
+    optimize_command.add_argument('--distance-weight', type=float, default=0.0,
+                                  help="with --frontier, extra cost per mile of the round trip")
+    _add_solve_options(optimize_command)
+
+    plans = commands.add_parser('plans', help="solve a range of demands and stream the plans to a CSV, JSON-lines, Arrow or text file")
+    plans.add_argument('first', type=int, help="smallest number of sodas")
+    plans.add_argument('last', type=int, help="largest number of sodas")
+    plans.add_argument('output', help="file to write the plans to (.csv, .jsonl, .arrow or .txt)")
+    plans.add_argument('--format', choices=['csv', 'jsonl', 'arrow', 'text'], help="output format (default: from the file extension)")
+    plans.add_argument('--batch-size', type=int, default=1000, help="plans solved and written at a time")
+    plans.add_argument('--home', type=float, nargs=2, metavar=('LAT', 'LON'), help="home location (default: built-in 'Home')")
+    plans.add_argument('--solver', choices=['auto', 'dp', 'pulp'], default='auto', help="optimization engine")
+    plans.add_argument('--with-routes', action='store_true', help="also plan the driving route of every plan")
+    _add_solve_options(plans)
+
+    households = commands.add_parser('households', help="solve many homes from a jobs file in parallel")
+    households.add_argument('jobs', help="CSV or JSON-lines file with home_lat, home_lon, demand")
+    households.add_argument('output', help="JSON-lines file to write one plan per job to")
+    households.add_argument('--workers', type=int, help="number of worker processes (default: all cores)")
+    households.add_argument('--chunk-size', type=int, default=16, help="jobs sent to a worker at a time")
+    _add_solve_options(households)
+
+    stream = commands.add_parser('stream', help="keep plans up to date from a stream of price/stock changes")
+    stream.add_argument('demands', type=int, nargs='+', help="standing demands to keep plans for")
+    stream.add_argument('--source', default='-', help="JSON-lines file of changes (default: stdin)")
+    stream.add_argument('--follow', action='store_true', help="keep waiting for new lines at the end of the file")
+    stream.add_argument('--home', type=float, nargs=2, metavar=('LAT', 'LON'), help="home location (default: built-in 'Home')")
+    _add_solve_options(stream)
+
+    frontier = commands.add_parser('frontier', help="precompute the Pareto frontier of plans for a range of demands")
+    frontier.add_argument('max_sodas', type=int, help="largest demand to precompute (all demands from 1 up are included)")
+    frontier.add_argument('output', help="JSON file to save the frontier to")
+    frontier.add_argument('--home', type=float, nargs=2, metavar=('LAT', 'LON'), help="home location (default: built-in 'Home')")
+    _add_solve_options(frontier)
+
+    stockup = commands.add_parser('stockup', help="plan weekly shopping over many weeks with a pantry and a trip budget")
+    stockup.add_argument('demands', type=int, nargs='+', help="sodas needed per week (repeated to fill --weeks)")
+    stockup.add_argument('--weeks', type=int, help="number of weeks to plan (default: one per demand given)")
+    stockup.add_argument('--capacity-oz', type=float, required=True, help="pantry capacity in fluid ounces")
+    stockup.add_argument('--max-trips', type=int, help="most store visits over the whole horizon")
+    stockup.add_argument('--prices', help="JSON-lines file of per-week prices: period, store, sku, price")
+    stockup.add_argument('--window', type=int, help="weeks per rolling window (default: the whole horizon in one model)")
+    stockup.add_argument('--step', type=int, help="weeks committed per window (default: the whole window)")
+    stockup.add_argument('--time-limit', type=float, help="seconds CBC may spend on each window")
+    stockup.add_argument('--home', type=float, nargs=2, metavar=('LAT', 'LON'), help="home location (default: built-in 'Home')")
+    _add_solve_options(stockup)
+
+    fleet = commands.add_parser('fleet', help="route delivery vans through many shopping plans with time windows")
+    fleet.add_argument('orders', help="JSON-lines file of plans to deliver, e.g. the output of the households command")
+    fleet.add_argument('--vehicles', type=int, required=True, help="number of vans")
+    fleet.add_argument('--capacity', type=int, required=True, help="packages a van can carry at once")
+    fleet.add_argument('--depot', type=float, nargs=2, metavar=('LAT', 'LON'), required=True, help="where the vans start and end")
+    fleet.add_argument('--time-limit', type=float, default=10.0, help="seconds the whole solve may take, all restarts included")
+    fleet.add_argument('--workers', type=int, help="number of restarts run in parallel (default: all cores)")
+    fleet.add_argument('--restarts', type=int, help="number of restarts (default: one per worker)")
+    fleet.add_argument('--speed-mph', type=float, default=25.0, help="average driving speed")
+    fleet.add_argument('--service-minutes', type=float, default=5.0, help="minutes spent at every stop")
+    fleet.add_argument('--shift', type=float, nargs=2, metavar=('START', 'END'), default=(0.0, 600.0),
+                       help="shift start and end, in minutes (order windows use the same clock)")
+    _add_solve_options(fleet)
+
+    serve = commands.add_parser('serve', help="run the optimizer as a local HTTP service")
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    serve.add_argument('--port', type=int, default=8080, help="port to listen on")
+    serve.add_argument('--workers', type=int, help="number of solver processes (default: all cores)")
+    serve.add_argument('--ttl', type=float, default=60.0, help="seconds to keep answers in the result cache")
+    serve.add_argument('--catalog', help="catalog file to load (default: built-in prices)")
+
+    commands.add_parser('interactive', help="ask for the number of sodas and print a text report")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.print_help()
+        return 2
+    # A frontier file already fixes how its plans were solved, so these options could only be ignored
+    if args.command == 'optimize' and args.frontier and (args.solver != 'auto' or args.model != 'per_package'):
+        parser.error("--solver and --model cannot be used with --frontier")
+    if args.trace:
+        enable_tracing()
+    try:
+        if args.profile or args.profile_out:
+            run_profiled(_run_command, args, path=args.profile_out)
+        else:
+            _run_command(args)
+    finally:
+        if args.trace:
+            export_trace(args.trace, format=args.trace_format)
+    return 0
+
+
+# Function to run the chosen command
+def _run_command(args):
+    if args.command == 'optimize':
+        _load_inputs(args)
+        if args.frontier:
+            plan = query_frontier(load_frontier(args.frontier), args.demand, preferences=dict(args.preference),
+                                  distance_weight=args.distance_weight, home=args.home, radius_miles=args.radius_miles,
+                                  k_nearest=args.k_nearest)
+        else:
+            container_preferences.update(args.preference)
+            plan = optimize(args.demand, home=args.home, radius_miles=args.radius_miles, k_nearest=args.k_nearest,
+                            solver=args.solver, with_route=not args.no_route, model=args.model)
+        print(json.dumps(plan.to_dict()))
+    elif args.command == 'plans':
+        _load_inputs(args)
+        summary = write_optimal_shopping_plans(range(args.first, args.last + 1), args.output, format=args.format,
+                                               batch_size=args.batch_size, radius_miles=args.radius_miles,
+                                               k_nearest=args.k_nearest, home=args.home, solver=args.solver,
+                                               with_routes=args.with_routes)
+        print(json.dumps(summary), file=sys.stderr)
+    elif args.command == 'households':
+        summary = run_household_jobs(args.jobs, args.output, catalog_path=args.catalog, workers=args.workers,
+                                     chunk_size=args.chunk_size, radius_miles=args.radius_miles, k_nearest=args.k_nearest,
+                                     road_paths=(args.road_edges, args.road_nodes) if args.road_edges else None)
+        print(json.dumps(summary), file=sys.stderr)
+    elif args.command == 'stream':
+        _load_inputs(args)
+        summary = run_price_stream(args.demands, source=args.source, follow=args.follow, radius_miles=args.radius_miles,
+                                   k_nearest=args.k_nearest, home=args.home)
+        print(json.dumps(summary), file=sys.stderr)
+    elif args.command == 'frontier':
+        _load_inputs(args)
+        save_frontier(build_pareto_frontier(range(1, args.max_sodas + 1), radius_miles=args.radius_miles,
+                                            k_nearest=args.k_nearest, home=args.home), args.output)
+    elif args.command == 'stockup':
+        _load_inputs(args)
+        weeks = args.weeks or len(args.demands)
+        demands = [args.demands[t % len(args.demands)] for t in range(weeks)]
+        plan = plan_stock_up(demands, args.capacity_oz, max_trips=args.max_trips, window=args.window, step=args.step,
+                             period_prices=read_period_prices(args.prices, weeks) if args.prices else None,
+                             time_limit=args.time_limit, radius_miles=args.radius_miles, k_nearest=args.k_nearest,
+                             home=args.home)
+        print(json.dumps(stock_up_to_dict(plan)))
+    elif args.command == 'fleet':
+        _load_inputs(args)
+        problem = build_fleet_problem(read_orders(args.orders), args.depot, args.vehicles, args.capacity,
+                                      speed_mph=args.speed_mph, service_minutes=args.service_minutes, shift=args.shift)
+        result = solve_fleet(problem, time_limit=args.time_limit, restarts=args.restarts, workers=args.workers)
+        print(json.dumps(result))
+        summary = {'orders': len(problem['order_ids']), 'unassigned': len(result['unassigned']),
+                   'vehicles_used': len(result['vehicles']), 'total_miles': result['total_miles'],
+                   'shipped': len(result['shipped']), 'seconds': result['seconds'],
+                   'orders_per_second': result['orders_per_second'], 'insertions_per_second': result['insertions_per_second']}
+        print(json.dumps(summary), file=sys.stderr)
+    elif args.command == 'serve':
+        run_service(host=args.host, port=args.port, workers=args.workers, ttl=args.ttl, catalog_path=args.catalog)
+    elif args.command == 'interactive':
+        get_optimal_shopping_plan()
+
+
+# Run the command line program when started with python -m soda
+if __name__ == '__main__':
+    sys.exit(main())
+
+# From a customer's perspective:
+# - This is how you run the program from a terminal, without writing any Python.
+
+# Here's what each command does:
+# 1. **optimize**: `python -m soda optimize 30` prints the best plan for 30 sodas as JSON, ready for another program to read.
+# 2. **plans**: `python -m soda plans 1 5000 plans.csv` solves every demand from 1 to 5000 and streams the plans to a file.
+# 3. **households**: `python -m soda households jobs.csv plans.jsonl` plans many homes at once, in parallel.
+# 4. **stream**: `python -m soda stream 24 100 < changes.jsonl` keeps plans for 24 and 100 sodas current as prices change.
+# 5. **frontier**: `python -m soda frontier 500 frontier.json` precomputes the plans worth considering for 1 to 500 sodas;
+#    `python -m soda optimize 30 --frontier frontier.json --preference glass=1` then answers instantly with new preferences.
+# 6. **stockup**: `python -m soda stockup 24 --weeks 52 --capacity-oz 2000 --max-trips 26` plans a year of weekly shopping.
+# 7. **fleet**: `python -m soda fleet plans.jsonl --vehicles 4 --capacity 60 --depot 33.7 -117.1` routes delivery vans
+#    that pick up every plan's packages at its stores and drop them off at each customer's home.
+# 8. **serve**: `python -m soda serve --port 8080` answers GET /optimize?demand=30 over HTTP.
+# 9. **interactive**: `python -m soda interactive` asks for the number of sodas and prints the familiar text report.
+# - Any command can be timed: `python -m soda --trace trace.json optimize 30` saves how long each stage took,
+#   and `python -m soda --profile --profile-out run.prof optimize 30` prints and saves a profile of every Python function that ran.
+
+# Why is this important?
+# - Scripts and services can call the optimizer and read its answer, without anyone typing at a prompt.
+# - Importing the soda package does nothing on its own; nothing runs until you call a function or a command.
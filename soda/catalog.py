@@ -0,0 +1,216 @@
+import csv
+import hashlib
+import json
+import os
+from array import array
+
+import numpy as np
+
+from .data import container_types, coordinates, fluid_ounces, prices, sodas_per_package
+
+
+# Columns of a catalog file, one row per store and item
+CATALOG_COLUMNS = ['store', 'sku', 'price', 'fluid_ounces', 'sodas_per_package', 'container', 'lat', 'lon']
+
+# The catalog loaded from a file with load_catalog(), or None to use the dictionaries in data.py
+_active_catalog = None
+# Cache of the catalog built from the dictionaries in data.py, keyed on their version
+_dict_catalog_cache = {}
+
+
+# Function to fingerprint the arrays and names of a catalog
+def _catalog_version(columns, names):
+    digest = hashlib.sha1(json.dumps(names, sort_keys=True).encode())
+    for key in sorted(columns):
+        digest.update(np.ascontiguousarray(columns[key]).tobytes())
+    return digest.hexdigest()
+
+
+# Function to start an empty catalog builder, which integer-codes names while rows stream in
+def _new_catalog_builder():
+    return {
+        'store_codes': {}, 'sku_codes': {}, 'container_codes': {},
+        'store_id': array('i'), 'sku_id': array('i'), 'container_id': array('b'),
+        'price': array('d'), 'fluid_ounces': array('d'), 'sodas_per_package': array('d'),
+        'store_lat': {}, 'store_lon': {},
+    }
+
+
+# Function to add one row to a catalog builder
+def _add_catalog_row(builder, store, sku, price, ounces, units, container, lat, lon):
+    # Each distinct name gets the next integer id the first time it is seen
+    store_id = builder['store_codes'].setdefault(store, len(builder['store_codes']))
+    builder['store_id'].append(store_id)
+    builder['sku_id'].append(builder['sku_codes'].setdefault(sku, len(builder['sku_codes'])))
+    builder['container_id'].append(builder['container_codes'].setdefault(container, len(builder['container_codes'])))
+    builder['price'].append(float(price))
+    builder['fluid_ounces'].append(float(ounces))
+    builder['sodas_per_package'].append(float(units))
+    # Coordinates are kept once per store; a missing value means the store has no location
+    if lat not in (None, '') and lon not in (None, ''):
+        builder['store_lat'][store_id] = float(lat)
+        builder['store_lon'][store_id] = float(lon)
+
+
+# Function to turn a finished builder into a columnar catalog
+def _finish_catalog(builder):
+    num_stores = len(builder['store_codes'])
+    store_lat = np.full(num_stores, np.nan)
+    store_lon = np.full(num_stores, np.nan)
+    store_lat[list(builder['store_lat'])] = list(builder['store_lat'].values())
+    store_lon[list(builder['store_lon'])] = list(builder['store_lon'].values())
+    columns = {
+        'store_id': np.frombuffer(builder['store_id'], dtype=np.int32).copy(),
+        'sku_id': np.frombuffer(builder['sku_id'], dtype=np.int32).copy(),
+        'container_id': np.frombuffer(builder['container_id'], dtype=np.int8).copy(),
+        'price': np.frombuffer(builder['price'], dtype=np.float64).copy(),
+        'fluid_ounces': np.frombuffer(builder['fluid_ounces'], dtype=np.float64).copy(),
+        'sodas_per_package': np.frombuffer(builder['sodas_per_package'], dtype=np.float64).copy(),
+        'store_lat': store_lat,
+        'store_lon': store_lon,
+    }
+    # dicts keep insertion order, so the list position of each name is its id
+    names = {
+        'store_names': list(builder['store_codes']),
+        'sku_names': list(builder['sku_codes']),
+        'container_names': list(builder['container_codes']),
+    }
+    # Every store sells each item at one price; a second row would be a second, conflicting package in the solver
+    pairs = columns['store_id'].astype(np.int64) * max(1, len(names['sku_names'])) + columns['sku_id']
+    unique_pairs, counts = np.unique(pairs, return_counts=True)
+    if (counts > 1).any():
+        store, sku = divmod(int(unique_pairs[np.argmax(counts > 1)]), max(1, len(names['sku_names'])))
+        raise ValueError(f"Catalog lists {names['sku_names'][sku]} at {names['store_names'][store]} more than once")
+    return _make_catalog(columns, names)
+
+
+# Function to wrap columns and names into a catalog dictionary
+def _make_catalog(columns, names, version=None):
+    catalog = dict(columns)
+    catalog.update(names)
+    catalog['num_rows'] = len(columns['price'])
+    catalog['version'] = version or _catalog_version(columns, names)
+    return catalog
+
+# From a customer's perspective:
+# - A catalog is the whole price list stored as a few long columns of numbers instead of many small dictionaries.
+# - Store names, item names and container types are written once and then referred to by a number, which saves a lot of memory.
+# - This is what lets a feed with hundreds of thousands of store and item rows fit comfortably in memory.
+
+
+# Function to build the catalog from the dictionaries defined in data.py
+def catalog_from_dicts():
+    builder = _new_catalog_builder()
+    for store in prices:
+        lat, lon = coordinates.get(store, (None, None))
+        for item in prices[store]:
+            _add_catalog_row(builder, store, item, prices[store][item], fluid_ounces[store][item],
+                             sodas_per_package[store][item], container_types[item], lat, lon)
+    return _finish_catalog(builder)
+
+
+# Function to stream the rows of a catalog file as dictionaries
+def _iter_catalog_rows(path):
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            yield from csv.DictReader(f)
+    elif path.endswith('.jsonl'):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith('.parquet'):
+        # Parquet support is optional and needs pyarrow
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet catalogs requires pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches(columns=CATALOG_COLUMNS):
+            columns = batch.to_pydict()
+            for i in range(batch.num_rows):
+                yield {key: columns[key][i] for key in CATALOG_COLUMNS}
+    else:
+        raise ValueError(f"Unsupported catalog file type: {path} (use .csv, .jsonl or .parquet)")
+
+
+# Function to save a catalog as a directory of .npy files that can be memory-mapped later
+def save_catalog_cache(catalog, cache_dir, source=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    for key in ['store_id', 'sku_id', 'container_id', 'price', 'fluid_ounces', 'sodas_per_package', 'store_lat', 'store_lon']:
+        np.save(os.path.join(cache_dir, key + '.npy'), catalog[key])
+    meta = {key: catalog[key] for key in ['store_names', 'sku_names', 'container_names', 'version']}
+    # Remember which source file the cache was made from, so a changed file is loaded again
+    if source is not None:
+        stat = os.stat(source)
+        meta['source'] = {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}
+    with open(os.path.join(cache_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+# Function to open a saved catalog cache with its arrays memory-mapped, or None if it is missing or stale
+def open_catalog_cache(cache_dir, source=None):
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if source is not None:
+        stat = os.stat(source)
+        if meta.get('source') != {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}:
+            return None
+    columns = {key: np.load(os.path.join(cache_dir, key + '.npy'), mmap_mode='r')
+               for key in ['store_id', 'sku_id', 'container_id', 'price', 'fluid_ounces', 'sodas_per_package', 'store_lat', 'store_lon']}
+    names = {key: meta[key] for key in ['store_names', 'sku_names', 'container_names']}
+    return _make_catalog(columns, names, version=meta['version'])
+
+
+# Function to load a catalog file (CSV, JSONL or Parquet), using a memory-mapped binary cache when possible
+def load_catalog(path, cache_dir=None):
+    # By default the cache lives next to the file, e.g. stores.csv -> stores.csv.cache/
+    cache_dir = cache_dir or path + '.cache'
+    catalog = open_catalog_cache(cache_dir, source=path)
+    if catalog is not None:
+        return catalog
+
+    # Stream the rows one at a time; only the growing columns are kept in memory
+    builder = _new_catalog_builder()
+    for row in _iter_catalog_rows(path):
+        _add_catalog_row(builder, row['store'], row['sku'], row['price'], row['fluid_ounces'],
+                         row['sodas_per_package'], row['container'], row.get('lat'), row.get('lon'))
+    catalog = _finish_catalog(builder)
+    save_catalog_cache(catalog, cache_dir, source=path)
+    return catalog
+
+# From a customer's perspective:
+# - Instead of typing every price into this file, you can point the program at a price feed.
+# - The feed can be a CSV file, a JSON-lines file or a Parquet file, with the columns listed in CATALOG_COLUMNS.
+# - The first load reads the file row by row and saves a binary copy next to it.
+# - Later loads open that binary copy directly from disk (memory mapping), which is almost instant.
+# - If the feed file changes, the binary copy is rebuilt automatically.
+# - A feed that lists the same item at the same store twice is refused, saying which one, instead of guessing which price is right.
+
+
+# Function to choose the catalog that the whole program reads from
+def set_catalog(catalog):
+    global _active_catalog
+    _active_catalog = catalog
+    # Routes remembered so far were planned between the old stores
+    from .routing import clear_route_cache
+    clear_route_cache()
+
+
+# Function to get the catalog that the whole program reads from
+def get_catalog():
+    if _active_catalog is not None:
+        return _active_catalog
+    # Without a loaded catalog, use the dictionaries in data.py, rebuilt only when they change
+    version = hashlib.sha1(json.dumps([prices, fluid_ounces, sodas_per_package, container_types, coordinates],
+                                      sort_keys=True, default=str).encode()).hexdigest()
+    if version not in _dict_catalog_cache:
+        _dict_catalog_cache.clear()
+        _dict_catalog_cache[version] = catalog_from_dicts()
+    return _dict_catalog_cache[version]
+
+# From a customer's perspective:
+# - There is always exactly one catalog in use: either the one you loaded with set_catalog(load_catalog(...)), or the built-in prices in data.py.
+# - Costs, plans and the printed report all read from it.
@@ -0,0 +1,149 @@
+import hashlib
+import json
+
+import numpy as np
+
+from .catalog import get_catalog
+from .data import container_preferences, coordinates, free_shipping_thresholds, shipping_costs, travel_cost_per_mile
+from .roads import get_road_graph, travel_distances_from
+from .profiling import annotate, span
+from .spatial import find_candidate_stores
+
+
+# Cache of cost tables, keyed on the version of the input data they were built from
+_cost_table_cache = {}
+
+
+# Function to fingerprint the input data that the cost table depends on
+def get_data_version(home=None):
+    # Any change to the catalog, the home location, shipping or preferences gives a new version
+    road_graph = get_road_graph()
+    data = [get_catalog()['version'], tuple(home or coordinates['Home']), shipping_costs, free_shipping_thresholds,
+            travel_cost_per_mile, container_preferences, road_graph and road_graph['version']]
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+# From a customer's perspective:
+# - This is a short "fingerprint" of all the price and store data.
+# - If nothing has changed since the last question, the fingerprint is the same and the old answers can be reused.
+
+
+# Function to build the cost table: one row per store and item, stored as flat arrays
+def build_cost_table(radius_miles=None, k_nearest=None, home=None):
+    home = tuple(home or coordinates['Home'])
+    catalog = get_catalog()
+    store_names = catalog['store_names']
+    sku_names = catalog['sku_names']
+    # Keep only the rows of stores that survive the distance pruning
+    with span('candidate_stores', radius_miles=radius_miles, k_nearest=k_nearest):
+        rows = np.flatnonzero(np.isin(catalog['store_id'], find_candidate_stores(radius_miles, k_nearest, home)))
+    store_id = np.asarray(catalog['store_id'])[rows]
+    package_prices = np.asarray(catalog['price'], dtype=float)[rows]
+    sizes = np.asarray(catalog['sodas_per_package'])[rows].astype(np.int64)
+    container_id = np.asarray(catalog['container_id'])[rows]
+    # Look up the preference of each container type once, then spread it over the packages
+    container_preference = np.array([container_preferences[name] for name in catalog['container_names']], dtype=float)
+    preferences = container_preference[container_id]
+    packages = [(store_names[s], sku_names[k]) for s, k in zip(store_id.tolist(), np.asarray(catalog['sku_id'])[rows].tolist())]
+
+    # Calculate the travel distance from home once per store, not once per item
+    store_lat = np.asarray(catalog['store_lat'])
+    store_lon = np.asarray(catalog['store_lon'])
+    distances = np.full(len(store_names), np.nan)
+    used_stores = np.unique(store_id)
+    used_stores = used_stores[~np.isnan(store_lat[used_stores])]
+    # By road when a road graph is set, otherwise in straight-line miles
+    distances[used_stores] = travel_distances_from(home, store_lat[used_stores], store_lon[used_stores])
+    located = ~np.isnan(distances)
+    travel_distance = {store_names[s]: float(distances[s]) for s in np.flatnonzero(located)}
+    store_coordinates = {store_names[s]: (float(store_lat[s]), float(store_lon[s])) for s in np.flatnonzero(located)}
+    # Stores without coordinates have no travel cost
+    travel_cost = np.where(located, distances, 0.0)[store_id] * travel_cost_per_mile
+
+    # Determine the shipping cost per package
+    store_shipping = np.array([shipping_costs.get(store, 0) for store in store_names], dtype=float)
+    shipping_cost = store_shipping[store_id]
+    for store, rule in free_shipping_thresholds.items():
+        if store in store_names:
+            at_store = store_id == store_names.index(store)
+            # Free shipping for orders over the threshold, otherwise the fee
+            shipping_cost[at_store] = np.where(package_prices[at_store] < rule['free_over'], rule['fee'], 0)
+
+    # Calculate the cost per soda considering container preferences, for all packages at once
+    cost_per_soda = (package_prices + travel_cost + shipping_cost) / sizes * preferences
+
+    return {
+        'version': get_data_version(home),
+        'packages': packages,
+        'prices': package_prices,
+        'sizes': sizes,
+        'preferences': preferences,
+        'travel_costs': travel_cost,
+        'shipping_costs': shipping_cost,
+        'fluid_ounces': np.asarray(catalog['fluid_ounces'], dtype=float)[rows],
+        'containers': [catalog['container_names'][c] for c in container_id.tolist()],
+        'cost_per_soda': cost_per_soda,
+        'travel_distance': travel_distance,
+        'store_coordinates': store_coordinates,
+    }
+
+# From a customer's perspective:
+# - This works out what one soda really costs you at each store, once travel, shipping and your container taste are included.
+# - The distance to each store is measured only once, even when the store sells several packages.
+# - The costs are kept in one flat list (an array), which is much faster to work with than nested dictionaries.
+
+
+# Function to get the cost table, reusing the cached one when the input data has not changed
+def get_cost_table(radius_miles=None, k_nearest=None, home=None):
+    version = get_data_version(home)
+    key = (version, radius_miles, k_nearest)
+    with span('cost_table', cached=key in _cost_table_cache):
+        if key not in _cost_table_cache:
+            # Tables built from older data are no longer valid
+            for old_key in [k for k in _cost_table_cache if k[0] != version]:
+                del _cost_table_cache[old_key]
+            _cost_table_cache[key] = build_cost_table(radius_miles, k_nearest, home)
+        annotate(packages=len(_cost_table_cache[key]['packages']))
+        return _cost_table_cache[key]
+
+
+# Function to forget any cached cost table, e.g. after changing the data in place
+def invalidate_cost_table():
+    _cost_table_cache.clear()
+
+# From a customer's perspective:
+# - The cost table is only rebuilt when prices, stores, shipping or preferences change.
+# - Asking again with the same data skips all the distance and cost work.
+
+
+# Function to change the prices of a few rows of a cost table in place, recomputing only those rows
+def update_cost_table_rows(cost_table, rows, new_prices):
+    rows = np.asarray(rows, dtype=np.int64)
+    new_prices = np.asarray(new_prices, dtype=float)
+    cost_table['prices'][rows] = new_prices
+    # Shipping can depend on the price (free over a threshold), so it is recomputed for these rows too
+    for row, price in zip(rows.tolist(), new_prices.tolist()):
+        store = cost_table['packages'][row][0]
+        if store in free_shipping_thresholds:
+            rule = free_shipping_thresholds[store]
+            cost_table['shipping_costs'][row] = rule['fee'] if price < rule['free_over'] else 0
+        else:
+            cost_table['shipping_costs'][row] = shipping_costs.get(store, 0)
+    cost_table['cost_per_soda'][rows] = ((new_prices + cost_table['travel_costs'][rows] + cost_table['shipping_costs'][rows])
+                                         / cost_table['sizes'][rows] * cost_table['preferences'][rows])
+
+# From a customer's perspective:
+# - When a store changes a price, only that item's cost per soda needs working out again.
+# - Distances and everything else in the table stay as they are.
+# - This changes the table it is given, so use it on your own copy, not on the shared cached table.
+
+
+# Function to calculate the cost per soda for every store and item, as a nested dictionary
+def calculate_cost_per_soda():
+    cost_table = get_cost_table()
+    cost_per_soda = {}
+    for (store, item), cost in zip(cost_table['packages'], cost_table['cost_per_soda'].tolist()):
+        cost_per_soda.setdefault(store, {})[item] = cost
+    return cost_per_soda
+
+# From a customer's perspective:
+# - This is the same cost table laid out store by store, which is handy for reading it yourself.
@@ -1,49 +1,3 @@
-import numpy as np
-from ortools.constraint_solver import routing_enums_pb2
-from ortools.constraint_solver import pywrapcp
-from pulp import LpMinimize, LpProblem, LpVariable, lpSum
-from math import radians, cos, sin, sqrt, atan2
-
-# Haversine formula to calculate the distance between two points on the Earth
-def haversine(lat1, lon1, lat2, lon2):
-    # The Earth's radius in miles
-    R = 3958.8  # This is a constant value representing the average radius of the Earth
-
-    # Convert latitude and longitude from degrees to radians
-    # Latitude and longitude are usually given in degrees, but for accurate calculations, we need to convert them to radians
-    d_lat = radians(lat2 - lat1)  # Difference in latitude between the two points
-    d_lon = radians(lon2 - lon1)  # Difference in longitude between the two points
-    r_lat1 = radians(lat1)  # Convert the latitude of the first point to radians
-    r_lat2 = radians(lat2)  # Convert the latitude of the second point to radians
-
-    # Haversine formula to calculate the shortest distance over the Earth's surface
-    # This formula is great for calculating distances between two points on a sphere, like our planet
-    a = sin(d_lat / 2) ** 2 + cos(r_lat1) * cos(r_lat2) * sin(d_lon / 2) ** 2
-    # 'a' is the square of half the chord length between the points.
-    # It uses the differences in latitude and longitude to determine this.
-
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    # 'c' is the angular distance in radians, which is the central angle between the two points
-
-    # Finally, multiply 'c' by the Earth's radius to get the distance in miles
-    return R * c
-
-# From a customer's perspective:
-# - Imagine you want to know how far two places are from each other.
-# - For instance, you want to know the distance from your home to the nearest grocery store.
-# - The Haversine formula helps calculate this distance accurately by considering the Earth's curvature.
-
-# Here’s a step-by-step breakdown:
-# 1. Convert the latitude and longitude of both locations from degrees to radians.
-#    - Why? Because mathematical functions like sine and cosine work with radians, not degrees.
-# 2. Calculate the difference in latitude and longitude between the two points.
-# 3. Use the Haversine formula to find 'a', which gives you an idea of the relative distance between the points.
-# 4. Calculate 'c', the central angle, which tells you how far apart the two points are on the Earth's surface.
-# 5. Multiply 'c' by the Earth's radius to convert this angle into a distance in miles.
-
-# This means, with just the coordinates of two places, you can find out how far apart they are, helping you make decisions about travel or logistics.
-
-
 # GPS coordinates for your home and stores
 coordinates = {
     'Home': (33.721880, -117.139720),  # Your home
@@ -75,42 +29,6 @@ coordinates = {
 # - Essentially, it makes your shopping more efficient, saving you time and potentially money.
 
 
-# Calculate distances between all pairs of locations
-def calculate_distance_matrix(locations):
-    n = len(locations)  # Number of locations
-    distance_matrix = np.zeros((n, n))  # Create an n x n matrix filled with zeros to store distances
-    location_keys = list(locations.keys())  # List of location names
-
-    # Loop through each pair of locations to calculate the distance between them
-    for i in range(n):
-        for j in range(i + 1, n):
-            # Calculate the distance between location i and location j using the Haversine formula
-            distance = haversine(locations[location_keys[i]][0], locations[location_keys[i]][1], locations[location_keys[j]][0], locations[location_keys[j]][1])
-            distance_matrix[i, j] = distance  # Store the distance in the matrix
-            distance_matrix[j, i] = distance  # Since distance from i to j is the same as from j to i, store it symmetrically
-
-    return distance_matrix  # Return the matrix containing distances between all pairs of locations
-
-# From a customer's perspective:
-# - This function helps us figure out how far apart each pair of locations is.
-# - It's like creating a table that tells us the distance from every place to every other place.
-# - For example, if you want to know how far your home is from each store, this function calculates that for you.
-
-# Here's a step-by-step breakdown:
-# 1. **Number of Locations**: We count how many places we're dealing with.
-# 2. **Distance Matrix**: We create a table (matrix) to store distances between every pair of locations.
-# 3. **Location Names**: We list all the location names (like Home, Cardenas, Vons, etc.).
-# 4. **Calculate Distances**: We loop through each pair of locations and calculate the distance using the Haversine formula.
-#    - This part does the heavy lifting, calculating how far each place is from every other place.
-# 5. **Symmetry**: We store each distance in the matrix in both directions (from i to j and from j to i) because the distance is the same either way.
-# 6. **Return the Matrix**: Finally, we return the table with all the distances.
-
-# Why is this important?
-# - It helps in planning your shopping trip by knowing exactly how far each store is.
-# - By having all distances, you can decide the best route to take to minimize travel time and cost.
-# - Essentially, it makes your shopping more efficient and convenient.
-
-
 # Define data for the optimization
 prices = {
     'Cardenas': {'7.5oz_can_10pack': 9.29, '16.9oz_bottle_6pack': 7.99},
@@ -266,6 +184,25 @@ shipping_costs = {
 # - This information helps you compare not just the price of the sodas but also the total cost including delivery, ensuring you get the best overall deal.
 
 
+# Define stores that charge a delivery fee unless the order reaches a minimum amount
+free_shipping_thresholds = {
+    'Cardenas': {'fee': 10, 'free_over': 80},  # Cardenas charges $10, free for orders of $80 or more
+}
+
+# From a customer's perspective:
+# - Some stores deliver for free only if you spend enough in one order.
+# - For Cardenas, an order under $80 costs an extra $10; at $80 or more, delivery is free.
+# - The joint optimization model uses this to decide whether topping up an order to $80 is worth it.
+
+
+# Define how much a trip costs per mile of distance from home
+travel_cost_per_mile = 0.5
+
+# From a customer's perspective:
+# - Driving isn't free: gas and wear on the car add up.
+# - Every mile between your home and a store adds $0.50 to the cost of shopping there.
+
+
 # Define container preferences with a numerical value indicating preference level
 container_preferences = {
     'can': 1,       # Cans are preferred daily and durable containers
@@ -360,151 +297,3 @@ container_types = {
 # How does this affect the optimization?
 # - The program uses the container type information along with your preferences to suggest the best packages to buy.
 # - This way, you get not only the best deals but also the container types that match your preferences.
-
-
-# Function to determine the optimal shopping plan for buying sodas
-def get_optimal_shopping_plan():
-    # Ask the user for the number of sodas they want to buy
-    num_sodas = int(input("Enter the number of sodas you want: "))
-
-    # Dictionary to store the cost per soda for each store and item
-    cost_per_soda = {}
-    for store in prices:
-        cost_per_soda[store] = {}
-        for item in prices[store]:
-            # Get the container type for the current item
-            container = container_types[item]
-            # Calculate the travel cost from home to the store
-            travel_cost = haversine(coordinates['Home'][0], coordinates['Home'][1], coordinates[store][0], coordinates[store][1]) * 0.5 if store in coordinates else 0
-            # Initialize shipping cost to 0
-            shipping_cost = 0
-            # Determine the total cost considering shipping if applicable
-            if store == 'Cardenas':
-                total_cost = prices[store][item]
-                if total_cost < 80:
-                    shipping_cost = 10  # Free shipping for orders over $80
-            elif store == '7-Eleven':
-                shipping_cost = shipping_costs[store]
-            total_cost = prices[store][item] + travel_cost + shipping_cost
-            # Calculate the cost per soda considering container preferences
-            cost_per_soda[store][item] = (total_cost / sodas_per_package[store][item]) * container_preferences[container]
-
-    # Create an optimization problem to minimize cost
-    prob = LpProblem("Minimize_Cost", LpMinimize)
-    # Create variables to represent the amount to buy from each store and item
-    x = LpVariable.dicts("amounts_to_buy", [(store, item) for store in cost_per_soda for item in cost_per_soda[store]], 0, None, cat='Integer')
-    # Objective function: Minimize the total cost
-    prob += lpSum([cost_per_soda[store][item] * x[(store, item)] for store in cost_per_soda for item in cost_per_soda[store]])
-    # Constraint: The total number of sodas bought should equal the requested number
-    prob += lpSum([sodas_per_package[store][item] * x[(store, item)] for store in cost_per_soda for item in cost_per_soda[store]]) == num_sodas
-    # Solve the optimization problem
-    prob.solve()
-
-    # Calculate the total cost for Cardenas including shipping if applicable
-    total_cost_cardenas = 0
-    # Dictionary to store the amounts to buy from each store and item
-    amounts_to_buy = {k: v.varValue for k, v in x.items()}
-    # Set to store the stores to visit
-    stores_to_visit = set()
-
-    for (store, item), amount in amounts_to_buy.items():
-        if store == 'Cardenas':
-            total_cost_cardenas += amount * prices[store][item]
-        if amount > 0:
-            stores_to_visit.add(store)
-
-    # Apply shipping cost for Cardenas if the total is less than $80
-    if total_cost_cardenas < 80 and total_cost_cardenas > 0:
-        total_cost_cardenas += 10
-
-    # Print the optimal amounts to buy from each store
-    print("Amounts to buy (in number of sodas):")
-    for (store, item), amount in amounts_to_buy.items():
-        if amount > 0:
-            container_type = container_types[item]
-            travel_distance = haversine(coordinates['Home'][0], coordinates['Home'][1], coordinates[store][0], coordinates[store][1]) if store in coordinates else 'N/A'
-            total_cost = amount * prices[store][item]
-            fluid_ounce_per_soda = fluid_ounces[store][item] / sodas_per_package[store][item]
-            print(f"{store} - {item}: {amount * sodas_per_package[store][item]:.0f} sodas, {container_type} container, Total Cost: ${total_cost:.2f}, Travel Distance: {travel_distance} miles, Fluid Ounces per Soda: {fluid_ounce_per_soda:.2f} oz")
-
-    # Print the total cost for Cardenas if any sodas are bought from there
-    if total_cost_cardenas > 0:
-        print(f"Total cost for Cardenas including shipping: ${total_cost_cardenas:.2f}")
-
-    # If multiple stores are involved, calculate the optimized route for visiting them
-    if len(stores_to_visit) > 1:
-        print("\nOptimized route for visiting multiple stores:")
-        stores_to_visit = list(stores_to_visit)
-        filtered_coordinates = {k: coordinates[k] for k in ['Home'] + stores_to_visit}
-        distance_matrix = calculate_distance_matrix(filtered_coordinates)
-        tsp_data = {
-            'distance_matrix': distance_matrix,
-            'num_locations': len(distance_matrix),
-            'depot': 0  # Assuming 'Home' is the first in filtered_coordinates
-        }
-        manager = pywrapcp.RoutingIndexManager(len(tsp_data['distance_matrix']), 1, tsp_data['depot'])
-        routing = pywrapcp.RoutingModel(manager)
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return int(tsp_data['distance_matrix'][from_node][to_node])
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-        solution = routing.SolveWithParameters(search_parameters)
-        if solution:
-            print('Route:')
-            index = routing.Start(0)
-            plan_output = 'Route for vehicle 0:\n'
-            route_distance = 0
-            while not routing.IsEnd(index):
-                plan_output += ' {} ->'.format(list(filtered_coordinates.keys())[manager.IndexToNode(index)])
-                previous_index = index
-                index = solution.Value(routing.NextVar(index))
-                route_distance += routing.GetArcCostForVehicle(previous_index, index, 0)
-            plan_output += ' {}\n'.format(list(filtered_coordinates.keys())[manager.IndexToNode(index)])
-            plan_output += 'Distance of the route: {} miles\n'.format(route_distance)
-            print(plan_output)
-
-# From a customer's perspective:
-# - This function helps you figure out the best way to buy the number of sodas you want, considering both cost and container preferences.
-
-# Here's a step-by-step breakdown:
-# 1. **User Input**: You enter the number of sodas you want to buy.
-# 2. **Cost Calculation**: The program calculates the cost per soda for each store, including travel and shipping costs.
-# 3. **Optimization Problem**: It sets up an optimization problem to minimize the total cost.
-# 4. **Solving the Problem**: The program solves the optimization problem to find the best amounts to buy from each store.
-# 5. **Total Cost Calculation**: If buying from Cardenas, it considers shipping if the total is less than $80.
-# 6. **Print Results**: It prints the optimal amounts to buy from each store, along with the total cost and travel distance.
-# 7. **Optimized Route**: If multiple stores are involved, it calculates and prints the best route to visit all the stores.
-
-# Why is this important?
-# - It helps you get the best value for your money by considering prices, container preferences, travel costs, and shipping costs.
-# - By optimizing the shopping plan, you can save both time and money, ensuring you get the sodas you want in the most efficient way possible.
-
-
-# Call the function to determine and print the optimal shopping plan
-get_optimal_shopping_plan()
-
-# From a customer's perspective:
-# - This line is where you actually run the function to get your optimized shopping plan.
-# - It triggers the whole process of calculating the best way to buy the number of sodas you want.
-
-# Here's what happens when you run this function:
-# 1. **Prompt for Input**: The program will ask you to enter the number of sodas you want.
-# 2. **Cost Analysis**: It calculates the cost per soda at different stores, considering your preferences, travel costs, and shipping costs.
-# 3. **Optimization**: The program finds the most cost-effective way to purchase the sodas, making sure you get the best deal.
-# 4. **Results**: It prints out the amounts to buy from each store, total costs, and travel distances.
-# 5. **Route Optimization**: If necessary, it also calculates the most efficient route to visit multiple stores.
-
-# Why is this important?
-# - Running this function provides you with a detailed and optimized shopping plan.
-# - You can see exactly where to buy your sodas to get the best price and the most efficient route to pick them up.
-# - It saves you both time and money, ensuring you get the sodas you need in the most convenient way possible.
-
-# Imagine you need to stock up on sodas for a party:
-# - Instead of manually comparing prices and figuring out the best stores to visit, you just run this function.
-# - It does all the heavy lifting for you, providing a clear and optimized plan.
-# - You get the best deals without the hassle, and you know exactly where to go to get your sodas.
-
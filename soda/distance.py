@@ -0,0 +1,127 @@
+from math import radians, cos, sin, sqrt, atan2
+
+import numpy as np
+
+
+# Haversine formula to calculate the distance between two points on the Earth
+def haversine(lat1, lon1, lat2, lon2):
+    # The Earth's radius in miles
+    R = 3958.8  # This is a constant value representing the average radius of the Earth
+
+    # Convert latitude and longitude from degrees to radians
+    # Latitude and longitude are usually given in degrees, but for accurate calculations, we need to convert them to radians
+    d_lat = radians(lat2 - lat1)  # Difference in latitude between the two points
+    d_lon = radians(lon2 - lon1)  # Difference in longitude between the two points
+    r_lat1 = radians(lat1)  # Convert the latitude of the first point to radians
+    r_lat2 = radians(lat2)  # Convert the latitude of the second point to radians
+
+    # Haversine formula to calculate the shortest distance over the Earth's surface
+    # This formula is great for calculating distances between two points on a sphere, like our planet
+    a = sin(d_lat / 2) ** 2 + cos(r_lat1) * cos(r_lat2) * sin(d_lon / 2) ** 2
+    # 'a' is the square of half the chord length between the points.
+    # It uses the differences in latitude and longitude to determine this.
+
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    # 'c' is the angular distance in radians, which is the central angle between the two points
+
+    # Finally, multiply 'c' by the Earth's radius to get the distance in miles
+    return R * c
+
+# From a customer's perspective:
+# - Imagine you want to know how far two places are from each other.
+# - For instance, you want to know the distance from your home to the nearest grocery store.
+# - The Haversine formula helps calculate this distance accurately by considering the Earth's curvature.
+
+# Here’s a step-by-step breakdown:
+# 1. Convert the latitude and longitude of both locations from degrees to radians.
+#    - Why? Because mathematical functions like sine and cosine work with radians, not degrees.
+# 2. Calculate the difference in latitude and longitude between the two points.
+# 3. Use the Haversine formula to find 'a', which gives you an idea of the relative distance between the points.
+# 4. Calculate 'c', the central angle, which tells you how far apart the two points are on the Earth's surface.
+# 5. Multiply 'c' by the Earth's radius to convert this angle into a distance in miles.
+
+# This means, with just the coordinates of two places, you can find out how far apart they are, helping you make decisions about travel or logistics.
+
+
+# Vectorized Haversine formula: works on whole NumPy arrays of coordinates at once
+def haversine_np(lat1, lon1, lat2, lon2):
+    # The Earth's radius in miles, same as in haversine()
+    R = 3958.8
+
+    # Convert to radians; the inputs can be numbers or arrays that broadcast against each other
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    # Clip guards against rounding pushing 'a' just above 1 for antipodal points
+    return 2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# From a customer's perspective:
+# - This is the same distance formula as haversine(), but it measures thousands of trips in one go.
+# - Pass one home and an array of stores to get every home-to-store distance, or two arrays to get them pairwise.
+
+
+# Calculate distances from one point to many points
+def calculate_distances_from(origin, locations):
+    # origin is a (lat, lon) pair, locations is a dict of name -> (lat, lon)
+    points = np.array(list(locations.values()), dtype=float).reshape(-1, 2)
+    return haversine_np(origin[0], origin[1], points[:, 0], points[:, 1])
+
+# From a customer's perspective:
+# - For example, the distance from your home to every store on the list, in the same order as the list.
+
+
+# Calculate the distance matrix for arrays of latitudes and longitudes, optionally in row chunks
+def calculate_distance_matrix_np(lats, lons, chunk_size=None, dtype=np.float64, out=None):
+    # The Earth's radius in miles, same as in haversine()
+    R = 3958.8
+
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    n = lat.shape[0]
+    # Precompute the half-angle sines and cosines once per location, so no pair needs its own sin() call:
+    # sin((b - a) / 2) = sin(b / 2) * cos(a / 2) - cos(b / 2) * sin(a / 2)
+    sin_lat, cos_lat = np.sin(lat / 2), np.cos(lat / 2)
+    sin_lon, cos_lon = np.sin(lon / 2), np.cos(lon / 2)
+    cos_full_lat = np.cos(lat)
+    # The matrix can be written into a caller's array, e.g. an np.memmap on disk
+    distance_matrix = np.empty((n, n), dtype=dtype) if out is None else out
+
+    # Without a chunk size, every row is done in one block
+    chunk_size = max(chunk_size or n, 1)
+    for start in range(0, n, chunk_size):
+        rows = slice(start, min(start + chunk_size, n))
+        # Broadcast a block of rows against all columns; only this block is held in float64 at a time
+        sin_d_lat = np.outer(cos_lat[rows], sin_lat) - np.outer(sin_lat[rows], cos_lat)
+        sin_d_lon = np.outer(cos_lon[rows], sin_lon) - np.outer(sin_lon[rows], cos_lon)
+        a = sin_d_lat ** 2 + np.outer(cos_full_lat[rows], cos_full_lat) * sin_d_lon ** 2
+        distance_matrix[rows] = 2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return distance_matrix
+
+# From a customer's perspective:
+# - This builds the full table of distances between every pair of places without looping over pairs in Python.
+# - With tens of thousands of stores the table gets big, so:
+#     - chunk_size works through a few rows at a time, so the scratch memory stays small.
+#     - dtype=np.float32 stores the table in half the memory, still accurate to well under a foot for local trips.
+#     - out lets you pass an array on disk (np.memmap), so the table never has to fit in memory at all.
+
+
+# Calculate distances between all pairs of locations
+def calculate_distance_matrix(locations, chunk_size=None, dtype=np.float64, out=None):
+    # Stack the coordinates in the same order as the location names
+    points = np.array(list(locations.values()), dtype=float).reshape(-1, 2)
+    return calculate_distance_matrix_np(points[:, 0], points[:, 1], chunk_size=chunk_size, dtype=dtype, out=out)
+
+# From a customer's perspective:
+# - This function helps us figure out how far apart each pair of locations is.
+# - It's like creating a table that tells us the distance from every place to every other place.
+# - For example, if you want to know how far your home is from each store, this function calculates that for you.
+
+# Here's a step-by-step breakdown:
+# 1. **Coordinates**: We stack the latitude and longitude of every location (Home, Cardenas, Vons, etc.) into arrays, in the order they are listed.
+# 2. **Calculate Distances**: NumPy applies the Haversine formula to every pair of locations at once.
+#    - This part does the heavy lifting, calculating how far each place is from every other place.
+# 3. **Return the Matrix**: Finally, we return the table with all the distances; it is symmetric because the distance is the same either way.
+
+# Why is this important?
+# - It helps in planning your shopping trip by knowing exactly how far each store is.
+# - By having all distances, you can decide the best route to take to minimize travel time and cost.
+# - Essentially, it makes your shopping more efficient and convenient.
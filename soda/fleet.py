@@ -0,0 +1,302 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .catalog import get_catalog
+from .roads import travel_distance_matrix
+
+
+# Candidate insertion positions checked in full for each route, cheapest first
+FLEET_INSERTION_CANDIDATES = 8
+
+
+# Function to read delivery orders from a JSON-lines file, e.g. the output of run_household_jobs()
+def read_orders(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Function to turn shopping plans into a fleet routing problem: pickup stops at stores, a delivery stop per customer
+def build_fleet_problem(orders, depot, num_vehicles, capacity, speed_mph=25.0, service_minutes=5.0, shift=(0.0, 600.0)):
+    catalog = get_catalog()
+    store_coordinates = {name: (float(lat), float(lon)) for name, lat, lon
+                         in zip(catalog['store_names'], np.asarray(catalog['store_lat']), np.asarray(catalog['store_lon']))
+                         if not np.isnan(lat)}
+    # Location 0 is the depot; every store and customer home gets one location, shared by all stops there
+    locations = {'depot': tuple(depot)}
+    location_index = {'depot': 0}
+    stops = {'location': [], 'order': [], 'kind': [], 'load': [], 'earliest': [], 'latest': []}
+    order_ids = []
+    order_stops = []
+    shipped = []
+
+    for number, order in enumerate(orders):
+        amounts = order['amounts_to_buy']
+        if isinstance(amounts, dict):
+            amounts = [{'store': store, 'item': item, 'packages': n} for (store, item), n in amounts.items()]
+        packages_by_store = {}
+        for row in amounts:
+            # Stores without a location (online shops) ship to the customer themselves, so the van has nothing to collect
+            if row['packages'] > 0 and row['store'] in store_coordinates:
+                packages_by_store[row['store']] = packages_by_store.get(row['store'], 0) + int(round(row['packages']))
+        if not packages_by_store:
+            if any(row['packages'] > 0 for row in amounts):
+                shipped.append(order.get('order_id', order.get('job_id', number)))
+            continue
+        earliest, latest = order.get('window') or shift
+        home_name = f"customer:{order.get('order_id', order.get('job_id', number))}"
+        locations[home_name] = tuple(order['home'])
+        location_index.setdefault(home_name, len(location_index))
+
+        ids = []
+        # One pickup per store of the plan, any time during the shift, then the delivery within the customer's window
+        for store, packages in packages_by_store.items():
+            locations.setdefault(store, store_coordinates[store])
+            location_index.setdefault(store, len(location_index))
+            ids.append(_add_stop(stops, location_index[store], len(order_ids), 'pickup', packages, shift[0], shift[1]))
+        ids.append(_add_stop(stops, location_index[home_name], len(order_ids), 'delivery',
+                             -sum(packages_by_store.values()), float(earliest), float(latest)))
+        order_ids.append(order.get('order_id', order.get('job_id', number)))
+        order_stops.append(ids)
+
+    # One vectorized matrix for every place; driving minutes are miles times minutes_per_mile
+    distance = np.asarray(travel_distance_matrix(locations))
+    return {
+        'location_names': list(locations),
+        'distance': distance.tolist(),
+        'minutes_per_mile': 60.0 / speed_mph,
+        'service_minutes': service_minutes,
+        'shift': tuple(shift),
+        'num_vehicles': num_vehicles,
+        'capacity': capacity,
+        'stops': stops,
+        'order_ids': order_ids,
+        'order_stops': order_stops,
+        'shipped': shipped,
+    }
+
+
+# Function to append one stop to the stop columns and return its id
+def _add_stop(stops, location, order, kind, load, earliest, latest):
+    for key, value in zip(['location', 'order', 'kind', 'load', 'earliest', 'latest'], [location, order, kind, load, earliest, latest]):
+        stops[key].append(value)
+    return len(stops['location']) - 1
+
+# From a customer's perspective:
+# - Each shopping plan becomes one delivery order: the driver collects the packages at each store on the plan, then drops them off at the customer's home.
+# - A customer can give a time window, e.g. "between 9:00 and 11:00", as minutes from the start of the shift.
+# - Stops at the same store or home share one spot in the distance table, which is built once for everything.
+# - Packages from stores without a location (e.g. online shops) are shipped, so they need no pickup; an order made only of those is listed as shipped.
+
+
+# Function to drive one vehicle route and return its distance, or None if it breaks a time window, the capacity or the shift
+def _route_distance(problem, route):
+    D = problem['distance']
+    stops = problem['stops']
+    minutes_per_mile = problem['minutes_per_mile']
+    now, end_of_shift = problem['shift']
+    load = 0
+    miles = 0.0
+    here = 0
+    for stop in route:
+        there = stops['location'][stop]
+        miles += D[here][there]
+        # Arriving early means waiting; arriving late is not allowed
+        now = max(now + D[here][there] * minutes_per_mile, stops['earliest'][stop])
+        if now > stops['latest'][stop]:
+            return None
+        now += problem['service_minutes']
+        load += stops['load'][stop]
+        if load > problem['capacity']:
+            return None
+        here = there
+    miles += D[here][0]
+    if now + D[here][0] * minutes_per_mile > end_of_shift:
+        return None
+    return miles
+
+
+# Function to find the cheapest feasible place in one route for an order: its pickups as a block, then its delivery
+def _best_insertion(problem, route, order, counter):
+    D = problem['distance_np']
+    stops = problem['stops']
+    ids = problem['order_stops'][order]
+    pickups, delivery = ids[:-1], ids[-1]
+    # The order's stores are visited back to back, in the order the plan lists them
+    block_locations = [stops['location'][s] for s in pickups]
+    delivery_location = stops['location'][delivery]
+    block_miles = sum(D[a, b] for a, b in zip(block_locations, block_locations[1:]))
+
+    # Location before and after each gap in the route (gap i is in front of route[i]; gap len(route) is before the depot)
+    route_locations = np.array([stops['location'][s] for s in route], dtype=np.int64)
+    before = np.r_[0, route_locations]
+    after = np.r_[route_locations, 0]
+    gap = D[before, after]
+    block_extra = D[before, block_locations[0]] + block_miles + D[block_locations[-1], after] - gap
+    delivery_extra = D[before, delivery_location] + D[delivery_location, after] - gap
+    # extra[i, j]: block in gap i and delivery in gap j (j > i); the delivery straight after the block when j == i
+    extra = block_extra[:, None] + delivery_extra[None, :]
+    n = len(before)
+    extra[np.tril_indices(n, -1)] = np.inf
+    straight_after = (D[before, block_locations[0]] + block_miles + D[block_locations[-1], delivery_location]
+                      + D[delivery_location, after] - gap)
+    extra[np.arange(n), np.arange(n)] = straight_after
+
+    # Only the cheapest few placements are driven in full to check the time windows and capacity
+    flat = extra.ravel()
+    count = min(FLEET_INSERTION_CANDIDATES, flat.size)
+    for k in np.argsort(flat)[:count]:
+        if not np.isfinite(flat[k]):
+            break
+        i, j = divmod(int(k), n)
+        candidate = route[:i] + pickups + route[i:j] + [delivery] + route[j:]
+        counter[0] += 1
+        miles = _route_distance(problem, candidate)
+        if miles is not None:
+            return miles, candidate
+    return None
+
+
+# Function to insert an order into whichever route it makes the least longer; returns the vehicle, or None if none fits
+def _insert_order(problem, routes, route_miles, order, counter):
+    best = None
+    for v, route in enumerate(routes):
+        found = _best_insertion(problem, route, order, counter)
+        if found is not None and (best is None or found[0] - route_miles[v] < best[0]):
+            best = (found[0] - route_miles[v], v, found)
+    if best is None:
+        return None
+    _, v, (miles, route) = best
+    routes[v] = route
+    route_miles[v] = miles
+    return v
+
+# From a customer's perspective:
+# - An order is slotted into the van and the place in its route where it adds the fewest miles.
+# - The pickups always come before the drop-off, in the same van, and the van is never loaded beyond its capacity.
+# - Only the most promising few places are checked against the clock, which keeps this fast with hundreds of orders.
+
+
+# Function to run one restart: randomized cheapest insertion, then move orders between routes until nothing improves
+def _solve_fleet_restart(problem, seed, deadline):
+    # deadline is wall-clock time (time.time()), so it means the same moment in every worker process
+    start = time.perf_counter()
+    # Restarts that would begin after the deadline are skipped; the first one always runs, so there is an answer
+    if seed and time.time() >= deadline:
+        return None
+    rng = random.Random(seed)
+    problem = {**problem, 'distance_np': np.asarray(problem['distance'])}
+    stops = problem['stops']
+    counter = [0]
+    routes = [[] for _ in range(problem['num_vehicles'])]
+    route_miles = [0.0] * problem['num_vehicles']
+
+    # Tightest time windows first, shuffled a little differently by every restart
+    orders = list(range(len(problem['order_ids'])))
+    orders.sort(key=lambda o: stops['latest'][problem['order_stops'][o][-1]] * (1 + 0.2 * rng.random()))
+    where = {}
+    unassigned = []
+    for order in orders:
+        # Past the deadline, the orders not placed yet are left out rather than running over
+        v = _insert_order(problem, routes, route_miles, order, counter) if time.time() < deadline else None
+        if v is None:
+            unassigned.append(order)
+        else:
+            where[order] = v
+
+    # Relocate: take one order out and put it back wherever it fits best; keep the move only if the fleet drives less
+    tries_without_gain = 0
+    while where and tries_without_gain < 2 * len(where) and time.time() < deadline:
+        order = rng.choice(list(where))
+        v = where[order]
+        saved_routes, saved_miles = list(routes), list(route_miles)
+        total = sum(route_miles)
+        routes[v] = [s for s in routes[v] if stops['order'][s] != order]
+        route_miles[v] = _route_distance(problem, routes[v])
+        new_v = None if route_miles[v] is None else _insert_order(problem, routes, route_miles, order, counter)
+        if new_v is None or sum(route_miles) >= total - 1e-9:
+            routes[:], route_miles[:] = saved_routes, saved_miles
+            tries_without_gain += 1
+            continue
+        where[order] = new_v
+        tries_without_gain = 0
+        # Orders that did not fit before may fit now
+        for o in list(unassigned):
+            u = _insert_order(problem, routes, route_miles, o, counter)
+            if u is not None:
+                unassigned.remove(o)
+                where[o] = u
+
+    return {'routes': routes, 'route_miles': route_miles, 'unassigned': unassigned, 'evaluations': counter[0],
+            'seconds': time.perf_counter() - start, 'seed': seed}
+
+# From a customer's perspective:
+# - Each restart builds a full set of routes, then keeps moving single orders to a better van or a better place in the route.
+# - It stops at the deadline, or when a long run of tries finds nothing better; restarts that would begin after the deadline are skipped.
+
+
+# Function to route a fleet of vans through many orders, with restarts in parallel on all cores
+def solve_fleet(problem, time_limit=10.0, restarts=None, workers=None):
+    workers = workers or os.cpu_count() or 1
+    restarts = restarts or workers
+    start = time.perf_counter()
+    # One deadline for the whole solve, however many restarts there are and however they are shared out
+    deadline = time.time() + time_limit
+    if workers == 1:
+        results = [_solve_fleet_restart(problem, seed, deadline) for seed in range(restarts)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_solve_fleet_restart, [problem] * restarts, range(restarts), [deadline] * restarts))
+    seconds = time.perf_counter() - start
+    results = [result for result in results if result is not None]
+    # Serving the most orders comes first, then the fewest miles
+    best = min(results, key=lambda result: (len(result['unassigned']), sum(result['route_miles'])))
+    insertions = sum(result['evaluations'] for result in results)
+    vehicles = [_describe_vehicle_route(problem, v, route) for v, route in enumerate(best['routes']) if route]
+    return {
+        'vehicles': vehicles,
+        'unassigned': [problem['order_ids'][o] for o in best['unassigned']],
+        'shipped': problem['shipped'],
+        'total_miles': sum(best['route_miles']),
+        'restarts': len(results),
+        'best_seed': best['seed'],
+        'seconds': seconds,
+        'orders_routed': len(problem['order_ids']) - len(best['unassigned']),
+        'orders_per_second': (len(problem['order_ids']) - len(best['unassigned'])) / seconds if seconds > 0 else 0.0,
+        'insertions_checked': insertions,
+        'insertions_per_second': insertions / seconds if seconds > 0 else 0.0,
+    }
+
+# From a customer's perspective:
+# - Several differently shuffled attempts run at the same time, one per processor core, and the best one wins.
+# - "Best" means delivering as many orders as possible, then driving as few miles as possible.
+# - orders_per_second is how many orders ended up in the routes per second of solving.
+# - insertions_per_second is how many candidate places for an order were checked in full per second, across all cores.
+
+
+# Function to list one vehicle's stops with arrival times and load, for the report
+def _describe_vehicle_route(problem, vehicle, route):
+    D = problem['distance']
+    stops = problem['stops']
+    now = problem['shift'][0]
+    load = 0
+    here = 0
+    described = []
+    for stop in route:
+        there = stops['location'][stop]
+        now = max(now + D[here][there] * problem['minutes_per_mile'], stops['earliest'][stop])
+        load += stops['load'][stop]
+        described.append({'kind': stops['kind'][stop], 'order': problem['order_ids'][stops['order'][stop]],
+                          'location': problem['location_names'][there], 'arrival': now, 'load_after': load})
+        now += problem['service_minutes']
+        here = there
+    return {
+        'vehicle': vehicle,
+        'stops': described,
+        'miles': _route_distance(problem, route),
+        'return_time': now + D[here][0] * problem['minutes_per_mile'],
+    }
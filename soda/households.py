@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import numpy as np
+
+from .catalog import load_catalog, set_catalog
+from .roads import load_road_graph, set_road_graph
+from .solver import optimize
+
+
+# Function to stream household jobs (home_lat, home_lon, demand) from a CSV or JSON-lines file
+def iter_household_jobs(path):
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            rows = (json.loads(line) for line in f if line.strip())
+            yield from _number_household_jobs(rows)
+    else:
+        with open(path, newline='') as f:
+            yield from _number_household_jobs(csv.DictReader(f))
+
+
+# Function to give every job an id (its line number unless the file has a job_id column)
+def _number_household_jobs(rows):
+    for n, row in enumerate(rows):
+        yield {
+            'job_id': row.get('job_id', n),
+            'home': (float(row['home_lat']), float(row['home_lon'])),
+            'demand': int(row['demand']),
+        }
+
+
+# Options set by _init_household_worker for the current worker process
+_household_options = {'radius_miles': None, 'k_nearest': None}
+
+
+# Function that runs once in every worker process: load the shared catalog (and road graph) a single time
+def _init_household_worker(catalog_path, radius_miles, k_nearest, road_paths=None):
+    global _household_options
+    if catalog_path is not None:
+        # Workers open the memory-mapped cache, so the catalog is shared through the OS page cache
+        set_catalog(load_catalog(catalog_path))
+    if road_paths is not None:
+        set_road_graph(load_road_graph(*road_paths))
+    _household_options = {'radius_miles': radius_miles, 'k_nearest': k_nearest}
+
+
+# Function to solve one household: plan its demand from its own home location
+def solve_household(job):
+    start = time.perf_counter()
+    plan = optimize(job['demand'], home=job['home'], with_route=False, **_household_options)
+    result = {'job_id': job['job_id'], 'home': list(job['home']), 'demand': job['demand']}
+    result.update(plan.to_dict())
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+# Function to solve a chunk of households in one worker call
+def _solve_household_chunk(jobs):
+    return [solve_household(job) for job in jobs]
+
+
+# Function to solve every household in a jobs file with a process pool, streaming results to a JSON-lines file
+def run_household_jobs(jobs_path, output_path, catalog_path=None, workers=None, chunk_size=16,
+                       radius_miles=None, k_nearest=None, road_paths=None):
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    job_seconds = []
+    # Build the binary catalog cache up front, so the workers only ever open it and never race to write it
+    if catalog_path is not None:
+        load_catalog(catalog_path)
+
+    jobs = iter_household_jobs(jobs_path)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_household_worker,
+                             initargs=(catalog_path, radius_miles, k_nearest, road_paths)) as pool, open(output_path, 'w') as out:
+        pending = set()
+        while True:
+            # Keep only a few chunks in flight, so a huge jobs file is never held in memory at once
+            while len(pending) < workers * 2:
+                chunk = list(islice(jobs, chunk_size))
+                if not chunk:
+                    break
+                pending.add(pool.submit(_solve_household_chunk, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Write results as soon as their chunk finishes, in whatever order they finish
+            for future in done:
+                for result in future.result():
+                    out.write(json.dumps(result) + '\n')
+                    job_seconds.append(result['seconds'])
+            out.flush()
+
+    return {
+        'jobs': len(job_seconds),
+        'workers': workers,
+        'wall_seconds': time.perf_counter() - start,
+        'mean_job_seconds': float(np.mean(job_seconds)) if job_seconds else 0.0,
+        'max_job_seconds': float(np.max(job_seconds)) if job_seconds else 0.0,
+    }
+
+# From a customer's perspective:
+# - Instead of one home and one question, you hand over a file with many homes and how many sodas each one wants.
+# - The jobs file is a CSV or JSON-lines file with the columns home_lat, home_lon, demand (and optionally job_id).
+# - The work is shared out between several processes (workers) running at the same time, in small batches (chunks).
+
+# Here's a step-by-step breakdown:
+# 1. **Start Workers**: Each worker loads the price catalog once and keeps it for all its jobs.
+# 2. **Hand Out Chunks**: Jobs are read a few at a time and sent to whichever worker is free.
+# 3. **Solve**: For each job the worker finds the best plan from that household's home.
+# 4. **Stream Results**: Every finished plan is written straight to the output file as one JSON line, including how long it took.
+# 5. **Summary**: At the end you get the number of jobs, the total time, and the average and slowest time per job.
@@ -0,0 +1,238 @@
+import itertools
+import json
+
+import numpy as np
+
+from .costs import get_cost_table
+from .data import container_preferences, coordinates
+from .plan import Plan
+from .profiling import span
+from .routing import plan_route
+from .solver import build_dp_table, summarize_shopping_plan
+
+
+# Preference levels and per-mile weights tried for every container when the frontier is built
+FRONTIER_PREFERENCE_LEVELS = (0.5, 1, 1.5, 2, 3, 5)
+FRONTIER_DISTANCE_WEIGHTS = (0, 0.25, 1, 4)
+# Most weight combinations solved for a frontier; the full grid grows 6x with every container type in the catalog
+FRONTIER_MAX_WEIGHTINGS = 1000
+
+
+# Function to read every plan up to max_sodas out of a DP table, as {package index: packages} per quantity
+def _dp_plans(dp_table, max_sodas):
+    plans = [{}] + [None] * max_sodas
+    choice = dp_table['choice']
+    sizes = dp_table['sizes']
+    # The plan for n is the plan for n minus the last package's size, plus that package
+    for n in range(1, max_sodas + 1):
+        p = int(choice[n])
+        if p < 0 or plans[n - sizes[p]] is None:
+            continue
+        plans[n] = dict(plans[n - sizes[p]])
+        plans[n][p] = plans[n].get(p, 0) + 1
+    return plans
+
+
+# Function to choose the (container levels, distance weight) combinations to solve, at most max_weightings of them
+def _frontier_weightings(num_containers, preference_levels, distance_weights, max_weightings, seed=0):
+    if len(preference_levels) ** num_containers * len(distance_weights) <= max_weightings:
+        return [(levels, weight) for levels in itertools.product(preference_levels, repeat=num_containers)
+                for weight in distance_weights]
+    # Too many container types for the full grid: first each container at each level with the others at 1,
+    # then random mixes of levels until the budget is used up
+    weightings = {}
+    for weight in distance_weights:
+        for c in range(num_containers):
+            for level in preference_levels:
+                weightings[tuple(level if i == c else 1 for i in range(num_containers)), weight] = None
+    rng = np.random.default_rng(seed)
+    for _ in range(10 * max_weightings):
+        if len(weightings) >= max_weightings:
+            break
+        levels = tuple(rng.choice(preference_levels, size=num_containers).tolist())
+        weightings[levels, distance_weights[rng.integers(len(distance_weights))]] = None
+    return list(weightings)[:max_weightings]
+
+
+# Function to keep only the rows that no other row beats or ties in every column (smaller is better)
+def _pareto_rows(values):
+    keep = np.ones(len(values), dtype=bool)
+    for i in range(len(values)):
+        if keep[i]:
+            # Row i knocks out every row it is at least as good as everywhere and strictly better somewhere
+            dominated = np.all(values[i] <= values, axis=1) & np.any(values[i] < values, axis=1)
+            keep &= ~dominated
+    return np.flatnonzero(keep)
+
+
+# Function to precompute the Pareto-optimal plans over container costs and trip distance for every demand
+def build_pareto_frontier(demands, radius_miles=None, k_nearest=None, home=None,
+                          preference_levels=FRONTIER_PREFERENCE_LEVELS, distance_weights=FRONTIER_DISTANCE_WEIGHTS,
+                          max_weightings=FRONTIER_MAX_WEIGHTINGS):
+    demands = sorted({int(n) for n in demands})
+    max_sodas = max(demands, default=0)
+    home = tuple(home or coordinates['Home'])
+    cost_table = get_cost_table(radius_miles, k_nearest, home)
+    packages = cost_table['packages']
+    sizes = cost_table['sizes']
+    containers = sorted(container_preferences)
+    container_index = np.array([containers.index(c) for c in cost_table['containers']], dtype=np.int64)
+    # Cost per soda before the container preference is multiplied in, exactly as in the optimization model
+    base_cost = (cost_table['prices'] + cost_table['travel_costs'] + cost_table['shipping_costs']) / sizes
+    package_distance = np.array([cost_table['travel_distance'].get(store, 0.0) for store, item in packages])
+    weightings = _frontier_weightings(len(containers), preference_levels, distance_weights, max_weightings)
+
+    with span('pareto_frontier', demands=len(demands), packages=len(packages)):
+        # Solve one DP table per combination of weights; each gives a candidate plan for every demand at once
+        candidates = {n: {} for n in demands}
+        seen_tables = set()
+        for levels, distance_weight in weightings:
+            weights = base_cost * np.array(levels)[container_index] + distance_weight * package_distance / sizes
+            dp_table = build_dp_table({**cost_table, 'cost_per_soda': weights}, max_sodas)
+            # Different weights often lead to the very same choices, which need reading back only once
+            fingerprint = dp_table['choice'].tobytes()
+            if fingerprint in seen_tables:
+                continue
+            seen_tables.add(fingerprint)
+            plans = _dp_plans(dp_table, max_sodas)
+            for n in demands:
+                if plans[n] is not None:
+                    candidates[n].setdefault(tuple(sorted(plans[n].items())), None)
+
+        # The true optimum is known to be on the frontier only for the preferences that were solved without a distance weight
+        frontier = {'containers': containers, 'home': home, 'radius_miles': radius_miles, 'k_nearest': k_nearest,
+                    'exact_preferences': [list(levels) for levels, distance_weight in weightings if distance_weight == 0],
+                    'demands': {}}
+        for n in demands:
+            entries = [_describe_plan(dict(counts), cost_table, base_cost, container_index, len(containers), home)
+                       for counts in candidates[n]]
+            if not entries:
+                frontier['demands'][n] = _frontier_arrays([], len(containers))
+                continue
+            values = np.array([entry['container_costs'] + [entry['distance']] for entry in entries])
+            frontier['demands'][n] = _frontier_arrays([entries[i] for i in _pareto_rows(values)], len(containers))
+    return frontier
+
+# From a customer's perspective:
+# - Cheapest, nicest containers and shortest drive usually pull in different directions.
+# - This works out, ahead of time, every plan that is not beaten on all of them at once: the "Pareto frontier".
+# - Moving a preference slider afterwards only picks a different plan from this short list, with no solver involved.
+
+# Here's a step-by-step breakdown:
+# 1. **Weights**: Many combinations of container preferences and per-mile weights are tried (at most max_weightings).
+# 2. **Candidates**: Each combination is solved with the DP table, which answers every demand at once.
+# 3. **Measure**: Each distinct plan gets its cost per container type, its dollars, and its real round-trip distance.
+# 4. **Frontier**: Plans that another plan beats in every respect are dropped.
+
+
+# Function to measure one candidate plan: cost per container type, dollars, trip distance and sodas per container
+def _describe_plan(counts, cost_table, base_cost, container_index, num_containers, home):
+    indices = np.array(list(counts), dtype=np.int64)
+    amounts = np.array(list(counts.values()), dtype=float)
+    # The model's objective is sum(preference[c] * container_costs[c]), so any new preferences can be scored exactly
+    container_costs = np.bincount(container_index[indices], weights=amounts * base_cost[indices], minlength=num_containers)
+    sodas = np.bincount(container_index[indices], weights=amounts * cost_table['sizes'][indices], minlength=num_containers)
+    # The amounts, stores and Cardenas bill are summarized exactly as for a solved plan
+    summary = summarize_shopping_plan(int(amounts @ cost_table['sizes'][indices]), 'Optimal', None,
+                                      {p: float(amount) for p, amount in counts.items()}, cost_table)
+    stores = summary['stores_to_visit']
+
+    # Real round trip: the planned route through several stores, or there and back to a single store
+    routable = {store for store in stores if store in cost_table['store_coordinates']}
+    route = plan_route(routable, cost_table['store_coordinates'], home=home) if len(routable) > 1 else None
+    if route is not None:
+        distance = route['distance']
+    else:
+        distance = 2 * sum(cost_table['travel_distance'].get(store, 0.0) for store in routable)
+
+    return {
+        'amounts_to_buy': summary['amounts_to_buy'],
+        'stores_to_visit': sorted(stores),
+        'total_cost_cardenas': float(summary['total_cost_cardenas']),
+        'route': route,
+        'cost': float(np.sum(amounts * (cost_table['prices'][indices] + cost_table['shipping_costs'][indices]))),
+        'distance': float(distance),
+        'container_costs': container_costs.tolist(),
+        'container_sodas': sodas.tolist(),
+    }
+
+
+# Function to stack the numbers of a demand's frontier plans into arrays for fast scoring
+def _frontier_arrays(entries, num_containers):
+    return {
+        'plans': entries,
+        'container_costs': np.array([entry['container_costs'] for entry in entries]).reshape(-1, num_containers),
+        'container_sodas': np.array([entry['container_sodas'] for entry in entries]).reshape(-1, num_containers),
+        'cost': np.array([entry['cost'] for entry in entries]),
+        'distance': np.array([entry['distance'] for entry in entries]),
+    }
+
+
+# Function to pick the best frontier plan for a demand under new preferences, without solving anything
+def query_frontier(frontier, demand, preferences=None, distance_weight=0.0, max_distance=None, max_cost=None, home=None,
+                   radius_miles=None, k_nearest=None):
+    # A frontier only holds plans for the home and store filter it was built for; any that are given must match
+    asked = {'home': home and tuple(home), 'radius_miles': radius_miles, 'k_nearest': k_nearest}
+    for option, value in asked.items():
+        if value is not None and value != frontier[option]:
+            raise ValueError(f"The frontier was built for {option}={frontier[option]}, not {value}")
+    preferences = {**container_preferences, **(preferences or {})}
+    front = frontier['demands'].get(int(demand))
+    if front is None:
+        raise KeyError(f"The frontier was not built for {demand} sodas")
+
+    # With distance_weight=0 this is exactly the objective of the optimization model under the new preferences
+    weights = np.array([preferences[c] for c in frontier['containers']], dtype=float)
+    scores = front['container_costs'] @ weights + distance_weight * front['distance']
+    if max_distance is not None:
+        scores = np.where(front['distance'] <= max_distance, scores, np.inf)
+    if max_cost is not None:
+        scores = np.where(front['cost'] <= max_cost, scores, np.inf)
+
+    if not len(scores) or not np.isfinite(scores.min()):
+        return Plan(num_sodas=int(demand), status='Infeasible')
+    best = int(np.argmin(scores))
+    entry = front['plans'][best]
+    status = 'Optimal' if distance_weight == 0 and _was_solved(frontier, weights) else 'Feasible'
+    return Plan.from_dict({'num_sodas': int(demand), 'status': status, 'objective': float(scores[best]), **entry})
+
+
+# Function to check whether the frontier was built by solving these preferences (up to scale) without a distance weight
+def _was_solved(frontier, weights):
+    if weights.sum() <= 0:
+        return False
+    solved = np.array(frontier.get('exact_preferences', []), dtype=float).reshape(-1, len(weights))
+    return bool(np.any(np.all(np.isclose(solved / solved.sum(axis=1, keepdims=True), weights / weights.sum()), axis=1)))
+
+# From a customer's perspective:
+# - query_frontier(frontier, 30, preferences={'glass': 1}) answers "what if I didn't mind glass?" in microseconds.
+# - distance_weight adds a price per mile of the round trip, and max_distance / max_cost rule out plans that drive or cost too much.
+# - The answer is 'Optimal' when those preferences were among the ones solved; otherwise it is the best plan on the frontier ('Feasible').
+# - Asking for another home or store filter (home=, radius_miles=, k_nearest=) than the frontier was built for is an error, not a silent answer for the old one.
+
+
+# Function to save a frontier as JSON
+def save_frontier(frontier, path):
+    data = {key: value for key, value in frontier.items() if key != 'demands'}
+    data['demands'] = {str(n): [{**entry, 'amounts_to_buy': [[store, item, amount] for (store, item), amount
+                                                             in entry['amounts_to_buy'].items()]}
+                                for entry in front['plans']]
+                       for n, front in frontier['demands'].items()}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+# Function to load a frontier saved by save_frontier()
+def load_frontier(path):
+    with open(path) as f:
+        data = json.load(f)
+    frontier = {key: value for key, value in data.items() if key != 'demands'}
+    frontier['home'] = tuple(frontier['home'])
+    frontier['demands'] = {int(n): _frontier_arrays([{**entry, 'amounts_to_buy': {(store, item): amount for store, item, amount
+                                                                                   in entry['amounts_to_buy']}}
+                                                      for entry in entries], len(frontier['containers']))
+                           for n, entries in data['demands'].items()}
+    return frontier
+
+# From a customer's perspective:
+# - The frontier is worked out once (for example overnight) and saved, so interactive tools can load it and answer instantly.
@@ -0,0 +1,46 @@
+from dataclasses import dataclass, field
+
+
+# The result of one optimization: what to buy, where, and how to drive there
+# __slots__ keeps each plan small when thousands are held at once, e.g. in a batch run
+@dataclass(slots=True)
+class Plan:
+    num_sodas: int
+    status: str
+    objective: float = None
+    # Packages to buy, keyed on (store, item); only items with a nonzero amount are kept
+    amounts_to_buy: dict = field(default_factory=dict)
+    stores_to_visit: list = field(default_factory=list)
+    total_cost_cardenas: float = 0
+    route: dict = None
+
+    # Function to build a Plan from the plan dictionaries returned by get_optimal_shopping_plans()
+    @classmethod
+    def from_dict(cls, plan):
+        return cls(
+            num_sodas=plan['num_sodas'],
+            status=plan['status'],
+            objective=plan['objective'],
+            amounts_to_buy={package: amount for package, amount in plan['amounts_to_buy'].items() if amount > 0},
+            stores_to_visit=sorted(plan['stores_to_visit']),
+            total_cost_cardenas=plan['total_cost_cardenas'],
+            route=plan.get('route'),
+        )
+
+    # Function to turn the plan into plain lists and dictionaries that can be written as JSON
+    def to_dict(self):
+        return {
+            'num_sodas': self.num_sodas,
+            'status': self.status,
+            'objective': self.objective,
+            'amounts_to_buy': [{'store': store, 'item': item, 'packages': amount}
+                               for (store, item), amount in self.amounts_to_buy.items()],
+            'stores_to_visit': self.stores_to_visit,
+            'total_cost_cardenas': self.total_cost_cardenas,
+            'route': self.route,
+        }
+
+# From a customer's perspective:
+# - A Plan is your shopping list: how many packages to buy at each store, which stores that takes you to, and the route.
+# - to_dict() gives the same thing as plain data, ready to be saved or sent as JSON.
+# - Only the packages you actually buy are stored, so a plan stays small even with a catalog of millions of items.
@@ -0,0 +1,112 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Settings of the tracer; spans are only recorded after enable_tracing()
+trace_settings = {'enabled': False}
+# Finished spans, in the order they ended
+_spans = []
+# Spans that are open right now, innermost last
+_open_spans = []
+# The shared do-nothing context returned by span() while tracing is off
+_NO_SPAN = nullcontext()
+
+
+# Function to switch span recording on
+def enable_tracing():
+    trace_settings['enabled'] = True
+
+
+# Function to switch span recording off; spans recorded so far are kept
+def disable_tracing():
+    trace_settings['enabled'] = False
+
+
+# Function to forget all recorded spans
+def clear_trace():
+    _spans.clear()
+
+
+# Function to time one named stage of the program, used as `with span('cbc_solve', num_sodas=30):`
+def span(name, **attributes):
+    # While tracing is off this is one dictionary lookup, so the spans can stay in the hot path
+    if not trace_settings['enabled']:
+        return _NO_SPAN
+    return _record_span(name, attributes)
+
+
+@contextmanager
+def _record_span(name, attributes):
+    record = {'name': name, 'start_ns': time.perf_counter_ns(), 'duration_ns': None, 'depth': len(_open_spans),
+              'thread': threading.get_ident(), 'attributes': attributes}
+    _open_spans.append(record)
+    try:
+        yield record
+    finally:
+        _open_spans.pop()
+        record['duration_ns'] = time.perf_counter_ns() - record['start_ns']
+        _spans.append(record)
+
+
+# Function to add facts (solver status, model size, ...) to the innermost open span
+def annotate(**attributes):
+    if trace_settings['enabled'] and _open_spans:
+        _open_spans[-1]['attributes'].update(attributes)
+
+# From a customer's perspective:
+# - When a plan takes long, the spans show where the time went: the cost table, building the model, CBC, or the route.
+# - Nothing is recorded unless you switch it on, so normal runs are not slowed down.
+
+
+# Function to get the recorded spans with times in milliseconds from the first span, in start order
+def get_trace():
+    if not _spans:
+        return []
+    origin = min(record['start_ns'] for record in _spans)
+    return [{'name': record['name'], 'start_ms': (record['start_ns'] - origin) / 1e6,
+             'duration_ms': record['duration_ns'] / 1e6, 'depth': record['depth'], 'attributes': record['attributes']}
+            for record in sorted(_spans, key=lambda record: record['start_ns'])]
+
+
+# Function to write the recorded spans as a plain JSON list, or in the Chrome trace format
+def export_trace(path, format='json'):
+    if format == 'json':
+        data = get_trace()
+    elif format == 'chrome':
+        # Complete ("X") events in microseconds; open the file in chrome://tracing or https://ui.perfetto.dev
+        pid = os.getpid()
+        data = {'traceEvents': [{'name': record['name'], 'ph': 'X', 'ts': record['start_ns'] / 1e3,
+                                 'dur': record['duration_ns'] / 1e3, 'pid': pid, 'tid': record['thread'],
+                                 'args': record['attributes']} for record in _spans],
+                'displayTimeUnit': 'ms'}
+    else:
+        raise ValueError(f"Unknown trace format: {format} (use 'json' or 'chrome')")
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, default=str)
+
+# From a customer's perspective:
+# - The trace can be saved as a simple list of stages and times, or opened as a timeline in the Chrome trace viewer.
+
+
+# Function to run fn under cProfile, print the hottest functions and optionally save the full profile
+def run_profiled(fn, *args, path=None, limit=30, **kwargs):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        # The saved file can be opened with pstats or snakeviz
+        if path:
+            profiler.dump_stats(path)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        print(output.getvalue(), file=sys.stderr)
+
+# From a customer's perspective:
+# - The profile lists every Python function that ran and how long it took, which points at the exact slow line of code.
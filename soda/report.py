@@ -0,0 +1,32 @@
+import sys
+
+from .solver import optimize
+from .writers import write_plans
+
+
+# Function to determine the optimal shopping plan for buying sodas
+def get_optimal_shopping_plan():
+    # Ask the user for the number of sodas they want to buy
+    num_sodas = int(input("Enter the number of sodas you want: "))
+
+    # Solve for the requested number of sodas, with the route if it takes more than one store
+    plan = optimize(num_sodas)
+
+    # Print the plan with the text renderer of the plan writers
+    write_plans([plan], sys.stdout, format='text')
+
+# From a customer's perspective:
+# - This function helps you figure out the best way to buy the number of sodas you want, considering both cost and container preferences.
+
+# Here's a step-by-step breakdown:
+# 1. **User Input**: You enter the number of sodas you want to buy.
+# 2. **Cost Calculation**: The program calculates the cost per soda for each store, including travel and shipping costs.
+# 3. **Optimization Problem**: It sets up an optimization problem to minimize the total cost.
+# 4. **Solving the Problem**: The program solves the optimization problem to find the best amounts to buy from each store.
+# 5. **Total Cost Calculation**: If buying from Cardenas, it considers shipping if the total is less than $80.
+# 6. **Print Results**: It prints the optimal amounts to buy from each store, along with the total cost and travel distance.
+# 7. **Optimized Route**: If multiple stores are involved, it calculates and prints the best route to visit all the stores.
+
+# Why is this important?
+# - It helps you get the best value for your money by considering prices, container preferences, travel costs, and shipping costs.
+# - By optimizing the shopping plan, you can save both time and money, ensuring you get the sodas you want in the most efficient way possible.
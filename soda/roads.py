@@ -0,0 +1,230 @@
+import csv
+import hashlib
+import heapq
+import os
+
+import numpy as np
+
+from .distance import calculate_distance_matrix_np, haversine_np
+from .spatial import build_spatial_index, query_nearest
+
+
+# The road graph that travel distances are measured on, or None to use straight-line (haversine) miles
+_active_road_graph = None
+# Most road distances between pairs of places remembered in memory for route planning; the memory is emptied beyond it
+ROAD_PAIR_CACHE_SIZE = 1_000_000
+# Most road matrices kept on disk per road graph; the least recently used are deleted beyond it
+ROAD_MATRIX_CACHE_FILES = 64
+
+
+# Function to load a road network from an edge list (u, v, miles[, oneway]) and a node list (node, lat, lon)
+def load_road_graph(edges_path, nodes_path, weight='miles', cache_dir=None):
+    with open(nodes_path, newline='') as f:
+        nodes = list(csv.DictReader(f))
+    node_codes = {row['node']: i for i, row in enumerate(nodes)}
+    lats = np.array([float(row['lat']) for row in nodes])
+    lons = np.array([float(row['lon']) for row in nodes])
+
+    sources, targets, weights = [], [], []
+    with open(edges_path, newline='') as f:
+        for row in csv.DictReader(f):
+            u, v, w = node_codes[row['u']], node_codes[row['v']], float(row[weight])
+            sources.append(u)
+            targets.append(v)
+            weights.append(w)
+            # Roads are two-way unless the edge list says otherwise
+            if str(row.get('oneway', '')).lower() not in ('1', 'true', 'yes'):
+                sources.append(v)
+                targets.append(u)
+                weights.append(w)
+
+    # Compressed sparse rows: the edges leaving node i are indices[indptr[i]:indptr[i + 1]]
+    sources = np.array(sources, dtype=np.int64)
+    order = np.argsort(sources, kind='stable')
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.add.at(indptr, sources + 1, 1)
+    graph = {
+        'indptr': np.cumsum(indptr),
+        'indices': np.array(targets, dtype=np.int64)[order],
+        'weights': np.array(weights, dtype=float)[order],
+        'lat': lats,
+        'lon': lons,
+        'node_ids': [row['node'] for row in nodes],
+        'index': build_spatial_index(lats, lons),
+        'cache_dir': cache_dir or edges_path + '.cache',
+    }
+    digest = hashlib.sha1()
+    for key in ['indptr', 'indices', 'weights', 'lat', 'lon']:
+        digest.update(graph[key].tobytes())
+    graph['version'] = digest.hexdigest()
+    return graph
+
+# From a customer's perspective:
+# - Straight-line miles make a store across a freeway or a canyon look closer than it really is.
+# - A road network file lists every road segment (from node, to node, length in miles) and where each node is.
+# - It can come from an OpenStreetMap extract converted to two CSV files: edges (u, v, miles, oneway) and nodes (node, lat, lon).
+
+
+# Function to choose the road graph that travel distances are measured on (None goes back to straight-line miles)
+def set_road_graph(graph):
+    global _active_road_graph
+    _active_road_graph = graph
+    # Routes remembered so far were measured on the old distances
+    from .routing import clear_route_cache
+    clear_route_cache()
+
+
+# Function to get the road graph in use, or None
+def get_road_graph():
+    return _active_road_graph
+
+
+# Function to snap locations to their nearest road node, returning the node and the straight-line distance to it
+def snap_to_roads(graph, lats, lons):
+    nodes = np.empty(len(lats), dtype=np.int64)
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        nodes[i] = query_nearest(graph['index'], lat, lon, 1)[0][0]
+    return nodes, haversine_np(lats, lons, graph['lat'][nodes], graph['lon'][nodes])
+
+
+# Function to find the shortest road distance from a set of start nodes to the target nodes
+def dijkstra(graph, sources, targets, source_offsets=None):
+    # Plain lists are much faster than NumPy arrays for one-at-a-time lookups; they are made once per graph
+    if 'adjacency' not in graph:
+        graph['adjacency'] = (graph['indptr'].tolist(), graph['indices'].tolist(), graph['weights'].tolist())
+    indptr, indices, weights = graph['adjacency']
+    best = {}
+    # Every source starts with its own offset, so one run answers "distance from the nearest of these starts"
+    heap = [(float(offset), int(node)) for node, offset in zip(sources, source_offsets if source_offsets is not None
+                                                                  else [0.0] * len(sources))]
+    heapq.heapify(heap)
+    remaining = set(int(t) for t in targets)
+    while heap and remaining:
+        distance, node = heapq.heappop(heap)
+        if node in best:
+            continue
+        best[node] = distance
+        remaining.discard(node)
+        # Stop as soon as every target is settled; the rest of the network is never visited
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[edge]
+            if neighbour not in best:
+                heapq.heappush(heap, (distance + weights[edge], neighbour))
+    return np.array([best.get(int(t), np.inf) for t in targets])
+
+# From a customer's perspective:
+# - This is the classic "shortest drive" search: it spreads out from the start along the roads, always extending the closest point first.
+# - It stops as soon as all the stores we care about have been reached, so a big regional map stays quick.
+
+
+# Function to build the road distance matrix between locations, cached on disk and memory-mapped
+def road_distance_matrix(graph, lats, lons):
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    key = hashlib.sha1(graph['version'].encode() + lats.tobytes() + lons.tobytes()).hexdigest()
+    path = os.path.join(graph['cache_dir'], f'matrix-{key}.npy')
+    if os.path.exists(path):
+        # Mark the matrix as recently used, so the cache clean-up keeps it
+        os.utime(path)
+        return np.load(path, mmap_mode='r')
+
+    nodes, snap = snap_to_roads(graph, lats, lons)
+    n = len(lats)
+    matrix = np.zeros((n, n))
+    for i in range(n):
+        # One Dijkstra per location, starting at its road node after the short walk from the location itself
+        matrix[i] = dijkstra(graph, [nodes[i]], nodes, [snap[i]]) + snap
+    # Places the roads cannot connect, and places next to the same road node, use straight-line miles
+    straight = ~np.isfinite(matrix) | (nodes[:, None] == nodes[None, :])
+    if straight.any():
+        matrix[straight] = calculate_distance_matrix_np(lats, lons)[straight]
+
+    # Write to a temporary file first, so a crash never leaves half a matrix behind
+    os.makedirs(graph['cache_dir'], exist_ok=True)
+    np.save(path + '.tmp.npy', matrix)
+    os.replace(path + '.tmp.npy', path)
+    _trim_matrix_cache(graph['cache_dir'])
+    return np.load(path, mmap_mode='r')
+
+
+# Function to delete the least recently used road matrices beyond ROAD_MATRIX_CACHE_FILES
+def _trim_matrix_cache(cache_dir):
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+             if name.startswith('matrix-') and name.endswith('.npy') and '.tmp' not in name]
+    if len(paths) <= ROAD_MATRIX_CACHE_FILES:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - ROAD_MATRIX_CACHE_FILES]:
+        # Another process may be cleaning up at the same time
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Function to measure road distances from one origin to many locations
+def road_distances_from(graph, origin, lats, lons):
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    nodes, snap = snap_to_roads(graph, np.r_[origin[0], lats], np.r_[origin[1], lons])
+    distances = dijkstra(graph, nodes[:1], nodes[1:], snap[:1]) + snap[1:]
+    straight = ~np.isfinite(distances) | (nodes[1:] == nodes[0])
+    distances[straight] = haversine_np(origin[0], origin[1], lats[straight], lons[straight])
+    return distances
+
+# From a customer's perspective:
+# - The first time a set of stores is measured, the table of road distances between them is saved next to the road file.
+# - Later runs open that table straight from disk (memory mapping), so the road searches are not repeated.
+# - Any store the roads cannot reach is measured in straight-line miles instead, so a plan is always possible.
+# - So are places right next to each other (nearest to the same road node), like a store across the street.
+# - At most ROAD_MATRIX_CACHE_FILES tables are kept per road file; the ones unused for the longest time are deleted.
+
+
+# Function to measure travel distances from one origin to many locations: by road when a graph is set, else straight-line
+def travel_distances_from(origin, lats, lons):
+    if _active_road_graph is None:
+        return haversine_np(origin[0], origin[1], lats, lons)
+    return road_distances_from(_active_road_graph, origin, lats, lons)
+
+
+# Function to measure the road distance between every pair of points, remembering each pair so later routes reuse it
+def _road_pair_distances(graph, points):
+    pairs = graph.setdefault('pairs', {})
+    keys = [tuple(point) for point in points.tolist()]
+    n = len(keys)
+    matrix = np.zeros((n, n))
+    nodes = snap = None
+    for i in range(n):
+        missing = [j for j in range(n) if j != i and (keys[i], keys[j]) not in pairs]
+        row = {j: pairs[keys[i], keys[j]] for j in range(n) if j != i and j not in missing}
+        if missing:
+            if nodes is None:
+                nodes, snap = snap_to_roads(graph, points[:, 0], points[:, 1])
+            # One search from this stop that ends as soon as the route's other stops are reached
+            found = dijkstra(graph, [nodes[i]], nodes[missing], [snap[i]]) + snap[missing]
+            straight = ~np.isfinite(found) | (nodes[missing] == nodes[i])
+            found[straight] = haversine_np(points[i, 0], points[i, 1], points[missing, 0][straight], points[missing, 1][straight])
+            if len(pairs) + len(missing) > ROAD_PAIR_CACHE_SIZE:
+                pairs.clear()
+            for j, distance in zip(missing, found.tolist()):
+                pairs[keys[i], keys[j]] = row[j] = distance
+        for j, distance in row.items():
+            matrix[i, j] = distance
+    return matrix
+
+
+# Function to build the travel distance matrix for a dict of name -> (lat, lon): by road when a graph is set, else straight-line
+def travel_distance_matrix(locations, remember_pairs=False):
+    points = np.array(list(locations.values()), dtype=float).reshape(-1, 2)
+    if _active_road_graph is None:
+        return calculate_distance_matrix_np(points[:, 0], points[:, 1])
+    # Routes measure only their own stops, pair by pair, and remember each pair for the next route
+    if remember_pairs:
+        return _road_pair_distances(_active_road_graph, points)
+    return road_distance_matrix(_active_road_graph, points[:, 0], points[:, 1])
+
+# From a customer's perspective:
+# - The cost table (travel cost to each store) and the route planner both ask these two functions for distances.
+# - Without a road file they use the fast straight-line formula, exactly as before.
+# - With one, a route only measures the drives between its own stops: one short search from each stop, which stops once the others are reached.
+# - Every drive measured is remembered, so routes through the same stores, from any home, reuse them.
@@ -0,0 +1,262 @@
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .data import coordinates
+from .profiling import annotate, span
+from .roads import get_road_graph, travel_distance_matrix
+
+
+# Largest number of stops (not counting home) that the exact Held-Karp solver handles
+HELD_KARP_MAX_STOPS = 15
+
+
+# Function to find the shortest round trip from location 0 through all others, exactly, with bitmask dynamic programming
+def solve_route_held_karp(distance_matrix):
+    D = np.asarray(distance_matrix, dtype=float)
+    m = len(D) - 1  # Number of stops besides the depot
+    if m <= 0:
+        return {'order': [0, 0], 'distance': 0.0, 'backend': 'held_karp'}
+
+    # dp[mask, j] is the shortest path from the depot through the stops in mask, ending at stop j
+    masks = np.arange(1 << m)
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    dp[1 << np.arange(m), np.arange(m)] = D[0, 1:]
+    popcount = np.zeros(1 << m, dtype=np.int64)
+    for bit in range(m):
+        popcount += (masks >> bit) & 1
+    between = D[1:, 1:]
+
+    # Grow the visited sets one stop at a time; all sets of the same size are done together
+    for size in range(2, m + 1):
+        masks_of_size = masks[popcount == size]
+        for j in range(m):
+            ending_at_j = masks_of_size[(masks_of_size >> j) & 1 == 1]
+            # Come to j from the best stop k visited just before it
+            candidates = dp[ending_at_j ^ (1 << j)] + between[:, j]
+            best_k = np.argmin(candidates, axis=1)
+            dp[ending_at_j, j] = candidates[np.arange(len(ending_at_j)), best_k]
+            parent[ending_at_j, j] = best_k
+
+    # Close the loop back to the depot and walk the parents back to recover the order
+    full = (1 << m) - 1
+    totals = dp[full] + D[1:, 0]
+    j = int(np.argmin(totals))
+    distance = float(totals[j])
+    order = []
+    mask = full
+    while j >= 0:
+        order.append(j + 1)
+        j, mask = int(parent[mask, j]), mask ^ (1 << j)
+    return {'order': [0] + order[::-1] + [0], 'distance': distance, 'backend': 'held_karp'}
+
+# From a customer's perspective:
+# - This finds the truly shortest loop from home through every store and back.
+# - It remembers the best way to reach each group of stores, so it never re-checks the same partial trip twice.
+# - That is fast for up to about 15 stores; beyond that the number of groups grows too quickly.
+
+
+# Function to add up the length of a round trip given as a list of location indices
+def route_distance(distance_matrix, order):
+    D = np.asarray(distance_matrix, dtype=float)
+    order = np.asarray(order)
+    return float(D[order[:-1], order[1:]].sum())
+
+
+# Function to find a short round trip quickly: nearest neighbour, then 2-opt and Or-opt improvements
+def solve_route_heuristic(distance_matrix, max_rounds=100):
+    D = np.asarray(distance_matrix, dtype=float)
+    n = len(D)
+    if n <= 2:
+        order = list(range(n)) + [0]
+        return {'order': order, 'distance': route_distance(D, order), 'backend': 'heuristic'}
+
+    # Nearest neighbour: always drive to the closest store not yet visited
+    tour = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[0] = False
+    while unvisited.any():
+        nearest = np.where(unvisited, D[tour[-1]], np.inf).argmin()
+        tour.append(int(nearest))
+        unvisited[nearest] = False
+    tour = np.array(tour + [0])
+
+    for _ in range(max_rounds):
+        improved = False
+        # 2-opt: reverse a stretch of the tour whenever that uncrosses two legs
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i + 1:n], tour[i + 2:n + 1]
+            # The stretch is driven backwards afterwards; with one-way roads that can cost more (zero when D is symmetric)
+            forward = np.cumsum(D[tour[i:n], tour[i + 1:n + 1]])[:-1]
+            backward = np.cumsum(D[tour[i + 1:n + 1], tour[i:n]])[:-1]
+            gain = D[a, b] + D[c, d] - D[a, c] - D[b, d] + forward - backward
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                j = i + 1 + best
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                improved = True
+        # Or-opt: move a run of 1 to 3 stops to the place in the tour where it fits best
+        for length in (1, 2, 3):
+            for i in range(1, n - length + 1):
+                segment = tour[i:i + length]
+                before, after = tour[i - 1], tour[i + length]
+                removal_gain = D[before, segment[0]] + D[segment[-1], after] - D[before, after]
+                rest = np.concatenate([tour[:i], tour[i + length:]])
+                u, v = rest[:-1], rest[1:]
+                insertion_cost = D[u, segment[0]] + D[segment[-1], v] - D[u, v]
+                k = int(np.argmin(insertion_cost))
+                if removal_gain - insertion_cost[k] > 1e-9:
+                    tour = np.concatenate([rest[:k + 1], segment, rest[k + 1:]])
+                    improved = True
+        if not improved:
+            break
+
+    order = tour.tolist()
+    return {'order': order, 'distance': route_distance(D, order), 'backend': 'heuristic'}
+
+# From a customer's perspective:
+# - For long store lists the exact answer takes too long, so we build a good trip and then keep polishing it.
+# - First we always drive to the nearest store we haven't been to yet.
+# - Then "2-opt" reverses part of the trip wherever two legs of the route cross each other (counting one-way roads, where backwards is longer).
+# - And "Or-opt" picks up one to three stores in a row and slots them in wherever they add the least driving.
+# - It stops when no change makes the trip any shorter.
+
+
+# Function to find a round trip with Google OR-Tools (optional backend, needs the ortools package)
+def solve_route_ortools(distance_matrix, scale=1000):
+    from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+    D = np.asarray(distance_matrix, dtype=float)
+    # OR-Tools needs whole numbers, so work in thousandths of a mile instead of truncating to whole miles
+    scaled = np.rint(D * scale).astype(np.int64)
+    manager = pywrapcp.RoutingIndexManager(len(D), 1, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        return int(scaled[manager.IndexToNode(from_index), manager.IndexToNode(to_index)])
+
+    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    solution = routing.SolveWithParameters(search_parameters)
+    if not solution:
+        return None
+
+    order = []
+    index = routing.Start(0)
+    while not routing.IsEnd(index):
+        order.append(manager.IndexToNode(index))
+        index = solution.Value(routing.NextVar(index))
+    order.append(manager.IndexToNode(index))
+    # Report the true distance in miles from the float matrix
+    return {'order': order, 'distance': route_distance(D, order), 'backend': 'ortools'}
+
+
+# Function to find the best round trip from location 0, picking the solver by the number of stops
+def solve_route(distance_matrix, backend='auto'):
+    if backend == 'ortools':
+        return solve_route_ortools(distance_matrix)
+    if backend == 'held_karp' or (backend == 'auto' and len(distance_matrix) - 1 <= HELD_KARP_MAX_STOPS):
+        return solve_route_held_karp(distance_matrix)
+    return solve_route_heuristic(distance_matrix)
+
+# From a customer's perspective:
+# - Up to 15 stores, the trip is solved exactly; beyond that, the fast polishing heuristic is used.
+# - OR-Tools can still be chosen with backend='ortools' if it is installed.
+# - Distances are reported in real miles with decimals, not rounded down to whole miles.
+
+
+# Cache of solved routes, oldest first, so the least recently used route is dropped when it is full
+_route_cache = OrderedDict()
+# Settings and hit/miss counters of the route cache
+route_cache_settings = {'max_size': 4096, 'path': None}
+route_cache_stats = {'hits': 0, 'misses': 0}
+
+
+# Function to set the size limit of the route cache, and optionally a file to keep it in between runs
+def configure_route_cache(max_size=None, path=None):
+    if max_size is not None:
+        route_cache_settings['max_size'] = max_size
+    if path is not None:
+        route_cache_settings['path'] = path
+        if os.path.exists(path):
+            load_route_cache(path)
+    # Shrink the cache right away if the new limit is smaller
+    while len(_route_cache) > route_cache_settings['max_size']:
+        _route_cache.popitem(last=False)
+
+
+# Function to forget all cached routes and reset the counters
+def clear_route_cache():
+    _route_cache.clear()
+    route_cache_stats['hits'] = 0
+    route_cache_stats['misses'] = 0
+
+
+# Function to write the route cache to a JSON file
+def save_route_cache(path=None):
+    path = path or route_cache_settings['path']
+    entries = [{'home': list(home), 'stores': {store: list(point) for store, point in sorted(stops)}, 'backend': backend,
+                'road_graph': road_graph, 'route': route}
+               for (home, stops, backend, road_graph), route in _route_cache.items()]
+    # Write to a temporary file first, so a crash never leaves half a cache behind
+    with open(path + '.tmp', 'w') as f:
+        json.dump(entries, f)
+    os.replace(path + '.tmp', path)
+
+
+# Function to read routes saved by save_route_cache() into the cache
+def load_route_cache(path):
+    with open(path) as f:
+        entries = json.load(f)
+    for entry in entries[-route_cache_settings['max_size']:]:
+        # Entries from older files do not say where the stores were, so they cannot be trusted
+        if not isinstance(entry['stores'], dict):
+            continue
+        stops = frozenset((store, tuple(point)) for store, point in entry['stores'].items())
+        _route_cache[(tuple(entry['home']), stops, entry['backend'], entry.get('road_graph'))] = entry['route']
+
+
+# Function to plan the round trip from home through a set of stores, reusing a cached route when possible
+def plan_route(stores_to_visit, store_coordinates, home=None, backend='auto'):
+    home = tuple(home or coordinates['Home'])
+    # The same stores, at the same places, from the same home and on the same roads always have the same best route,
+    # whatever the demand was
+    road_graph = get_road_graph()
+    stops = frozenset((store, tuple(store_coordinates[store])) for store in stores_to_visit)
+    key = (home, stops, backend, road_graph and road_graph['version'])
+    if key in _route_cache:
+        route_cache_stats['hits'] += 1
+        _route_cache.move_to_end(key)
+        return _route_cache[key]
+
+    route_cache_stats['misses'] += 1
+    stores = sorted(stores_to_visit)
+    locations = {'Home': home, **{store: store_coordinates[store] for store in stores}}
+    with span('solve_route', stops=len(stores)):
+        solved = solve_route(travel_distance_matrix(locations, remember_pairs=True), backend=backend)
+        annotate(backend=solved and solved['backend'], distance=solved and solved['distance'])
+    location_names = list(locations)
+    route = None if solved is None else {
+        'route': [location_names[node] for node in solved['order']],
+        'distance': solved['distance'],
+        'backend': solved['backend'],
+    }
+
+    _route_cache[key] = route
+    if len(_route_cache) > route_cache_settings['max_size']:
+        _route_cache.popitem(last=False)
+    return route
+
+# From a customer's perspective:
+# - Many different soda amounts end up sending you to the same few stores.
+# - The best driving route only depends on where you start, which stores you visit and where they are, so once it is worked out we remember it.
+# - A store that moves, or a new road network, gets a fresh route; the file also records where each store was and which roads were used.
+# - The memory holds up to route_cache_settings['max_size'] routes; when full, the route unused for the longest time is forgotten.
+# - route_cache_stats counts how often a remembered route was reused (hits) and how often one had to be solved (misses).
+# - With configure_route_cache(path=...) the remembered routes are loaded from a file, and save_route_cache() writes them back for next time.
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from .catalog import load_catalog, set_catalog
+from .data import container_preferences
+from .solver import optimize
+
+
+# Optimization models a request may ask for
+SERVICE_MODELS = ('per_package', 'joint')
+# Most answers kept in the result cache; the oldest are dropped beyond it
+SERVICE_CACHE_MAX_ENTRIES = 10_000
+
+# Function that runs once in every worker process: load the shared catalog a single time
+def _init_service_worker(catalog_path):
+    if catalog_path is not None:
+        set_catalog(load_catalog(catalog_path))
+
+
+# Function that solves one request inside a worker process
+def _solve_service_request(request):
+    # Preferences are swapped in for this one solve; a worker handles one request at a time
+    saved = dict(container_preferences)
+    container_preferences.update(request['preferences'] or {})
+    try:
+        plan = optimize(request['demand'], home=request['home'], radius_miles=request['radius_miles'],
+                        k_nearest=request['k_nearest'], model=request['model'], with_route=request['with_route'])
+    finally:
+        container_preferences.clear()
+        container_preferences.update(saved)
+    return plan.to_dict()
+
+
+# Function to turn query-string or JSON parameters into a normalized request
+def parse_optimize_request(params):
+    home = params.get('home')
+    if home is None and 'lat' in params and 'lon' in params:
+        home = (params['lat'], params['lon'])
+    preferences = params.get('preferences') or {}
+    if isinstance(preferences, str):
+        preferences = json.loads(preferences)
+    # Unknown names are refused, as on the command line, instead of being solved as something else
+    if not isinstance(preferences, dict):
+        raise ValueError("preferences must be an object such as {\"glass\": 1}")
+    unknown = sorted(set(preferences) - set(container_preferences))
+    if unknown:
+        raise ValueError(f"unknown container {unknown[0]!r} (use one of {', '.join(container_preferences)})")
+    model = params.get('model', 'per_package')
+    if model not in SERVICE_MODELS:
+        raise ValueError(f"unknown model {model!r} (use one of {', '.join(SERVICE_MODELS)})")
+    return {
+        'demand': int(params['demand']),
+        'home': tuple(float(v) for v in home) if home is not None else None,
+        'radius_miles': float(params['radius_miles']) if params.get('radius_miles') is not None else None,
+        'k_nearest': int(params['k_nearest']) if params.get('k_nearest') is not None else None,
+        'model': model,
+        'with_route': str(params.get('with_route', 'true')).lower() not in ('0', 'false', 'no'),
+        'preferences': {key: float(value) for key, value in sorted(preferences.items())},
+    }
+
+
+# Function to build the key under which identical requests are coalesced and cached
+def _request_key(request):
+    return json.dumps(request, sort_keys=True)
+
+# From a customer's perspective:
+# - Two requests for the same home, the same number of sodas and the same preferences are the same question.
+# - The key is how the service recognises that, so the question is only worked out once.
+
+
+# Function to create the service state: worker pool, in-flight solves, result cache and counters
+def create_service(workers=None, ttl=60.0, catalog_path=None):
+    # Build the binary catalog cache up front, so the workers only ever open it
+    if catalog_path is not None:
+        load_catalog(catalog_path)
+    return {
+        'pool': ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_service_worker,
+                                    initargs=(catalog_path,)),
+        'ttl': ttl,
+        'inflight': {},
+        'cache': {},
+        'stats': {'requests': 0, 'solves': 0, 'coalesced': 0, 'cache_hits': 0, 'errors': 0},
+    }
+
+
+# Function to answer one optimize request: from the cache, by joining an identical solve in flight, or by solving
+async def handle_optimize(service, request):
+    service['stats']['requests'] += 1
+    key = _request_key(request)
+    now = time.monotonic()
+
+    cached = service['cache'].get(key)
+    if cached is not None and cached[0] > now:
+        service['stats']['cache_hits'] += 1
+        return cached[1]
+
+    # An identical request is already being solved: wait for the same answer instead of solving twice
+    if key in service['inflight']:
+        service['stats']['coalesced'] += 1
+        return await asyncio.shield(service['inflight'][key])
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(service['pool'], _solve_service_request, request)
+    service['inflight'][key] = future
+    service['stats']['solves'] += 1
+    try:
+        result = await future
+    finally:
+        del service['inflight'][key]
+    # Re-inserted, not overwritten, so a renewed answer counts as the newest
+    service['cache'].pop(key, None)
+    service['cache'][key] = (time.monotonic() + service['ttl'], result)
+    _expire_cache(service)
+    return result
+
+
+# Function to drop expired results from the cache, and the oldest ones while it is over its size limit
+def _expire_cache(service):
+    now = time.monotonic()
+    cache = service['cache']
+    for key in [key for key, (expires, result) in cache.items() if expires <= now]:
+        del cache[key]
+    # dicts keep insertion order, so the first keys are the oldest answers
+    while len(cache) > SERVICE_CACHE_MAX_ENTRIES:
+        del cache[next(iter(cache))]
+
+# From a customer's perspective:
+# - The solving happens in separate worker processes, so the service keeps answering other requests meanwhile.
+# - If many people ask the same question at the same moment, it is solved once and everyone gets that answer.
+# - Answers are remembered for `ttl` seconds, so asking again soon after is instant.
+# - At most SERVICE_CACHE_MAX_ENTRIES answers are remembered, so a flood of different questions cannot use up the memory.
+
+
+# Function to write one HTTP response
+def _write_response(writer, status, body, keep_alive):
+    payload = json.dumps(body).encode()
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+    headers = [f'HTTP/1.1 {status} {reason}', 'Content-Type: application/json', f'Content-Length: {len(payload)}',
+               'Connection: keep-alive' if keep_alive else 'Connection: close']
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + payload)
+
+
+# Function to serve one HTTP connection (keep-alive connections carry several requests)
+async def _handle_connection(service, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, version = request_line.decode().split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+            url = urlsplit(target)
+            try:
+                if url.path == '/optimize' and method in ('GET', 'POST'):
+                    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                    if method == 'POST' and body:
+                        params.update(json.loads(body))
+                    status, response = 200, await handle_optimize(service, parse_optimize_request(params))
+                elif url.path == '/stats':
+                    status, response = 200, service['stats']
+                elif url.path == '/health':
+                    status, response = 200, {'status': 'ok'}
+                else:
+                    status, response = 404, {'error': 'not found'}
+            except (KeyError, ValueError, TypeError) as e:
+                service['stats']['errors'] += 1
+                status, response = 400, {'error': str(e)}
+            except Exception as e:
+                service['stats']['errors'] += 1
+                status, response = 500, {'error': str(e)}
+
+            _write_response(writer, status, response, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionResetError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+# Function to start the HTTP server and return it along with the service state
+async def start_service(host='127.0.0.1', port=8080, workers=None, ttl=60.0, catalog_path=None):
+    service = create_service(workers=workers, ttl=ttl, catalog_path=catalog_path)
+    server = await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+    return server, service
+
+
+# Function to run the HTTP service until it is stopped
+def run_service(host='127.0.0.1', port=8080, workers=None, ttl=60.0, catalog_path=None):
+    async def serve():
+        server, service = await start_service(host, port, workers, ttl, catalog_path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service['pool'].shutdown()
+    asyncio.run(serve())
+
+# From a customer's perspective:
+# - This runs the optimizer as a small local web service, so other programs can ask it questions over HTTP.
+# - GET /optimize?demand=30&lat=33.72&lon=-117.14 answers with the plan as JSON.
+# - POST /optimize with a JSON body does the same, and can include "preferences": {"glass": 1}.
+# - GET /stats shows how many requests were solved, shared (coalesced) or answered from the cache.
@@ -0,0 +1,368 @@
+import os
+import tempfile
+
+import numpy as np
+
+from .costs import get_cost_table
+from .data import free_shipping_thresholds, shipping_costs, travel_cost_per_mile
+from .plan import Plan
+from .profiling import annotate, span, trace_settings
+from .routing import plan_route
+
+
+# Function to build the optimization model for a given cost table
+def build_shopping_model(cost_table, num_sodas=0):
+    # PuLP is only imported when a model is actually needed, so DP-only runs start quickly
+    from pulp import LpMinimize, LpProblem, LpVariable, lpSum
+
+    packages = cost_table['packages']
+    cost_per_soda = cost_table['cost_per_soda'].tolist()
+    sizes = cost_table['sizes'].tolist()
+    # Create an optimization problem to minimize cost
+    prob = LpProblem("Minimize_Cost", LpMinimize)
+    # Create variables to represent the amount to buy from each store and item
+    x = LpVariable.dicts("amounts_to_buy", packages, 0, None, cat='Integer')
+    # Objective function: Minimize the total cost
+    prob += lpSum([cost * x[package] for package, cost in zip(packages, cost_per_soda)])
+    # Constraint: The total number of sodas bought should equal the requested number
+    prob += lpSum([size * x[package] for package, size in zip(packages, sizes)]) == num_sodas, "demand"
+    return prob, x
+
+# From a customer's perspective:
+# - This sets up the "puzzle" the solver answers: buy whole packages, spend as little as possible, end up with exactly the sodas you asked for.
+# - The number of sodas lives in a single named constraint ("demand"), so the same puzzle can be re-asked for a different number without rebuilding it.
+
+
+# Function to turn the packages bought ({cost table row: amount}, nonzero rows only) into a shopping plan
+def summarize_shopping_plan(num_sodas, status, objective, bought, cost_table):
+    packages = cost_table['packages']
+    prices = cost_table['prices']
+    # Only the packages actually bought are kept, so a plan stays small however big the catalog is
+    amounts_to_buy = {}
+    # Goods bought at each store with a free-shipping threshold (Cardenas in the built-in data)
+    threshold_subtotals = {}
+    # Set to store the stores to visit
+    stores_to_visit = set()
+
+    # Rows in cost table order, so plans list their packages the same way however they were solved
+    for p, amount in sorted(bought.items()):
+        store, item = packages[p]
+        amounts_to_buy[store, item] = amount
+        if store in free_shipping_thresholds:
+            threshold_subtotals[store] = threshold_subtotals.get(store, 0) + amount * float(prices[p])
+        stores_to_visit.add(store)
+
+    # The bill at threshold stores, with their shipping fee unless the order reaches the free-shipping amount
+    total_cost_cardenas = 0
+    for store, subtotal in threshold_subtotals.items():
+        rule = free_shipping_thresholds[store]
+        total_cost_cardenas += subtotal + (rule['fee'] if 0 < subtotal < rule['free_over'] else 0)
+
+    return {
+        'num_sodas': num_sodas,
+        'status': status,
+        'objective': objective,
+        'amounts_to_buy': amounts_to_buy,
+        'stores_to_visit': stores_to_visit,
+        'total_cost_cardenas': total_cost_cardenas,
+    }
+
+
+# Function to read the solved model back into a shopping plan
+def extract_shopping_plan(num_sodas, prob, x, cost_table):
+    from pulp import LpStatus, value
+
+    return summarize_shopping_plan(num_sodas, LpStatus[prob.status], value(prob.objective), _bought_packages(x), cost_table)
+
+
+# Function to read the nonzero package amounts of a solved model, keyed on cost table row
+def _bought_packages(x):
+    # x has one variable per package, in the same order as the cost table
+    return {p: var.varValue for p, var in enumerate(x.values()) if (var.varValue or 0) > 0}
+
+# From a customer's perspective:
+# - Once the solver is done, this turns its answer into a plain plan: how many of each package, which stores, and the Cardenas bill.
+
+
+# Function to build the joint model: packages plus a yes/no "visit store" choice with real trip and shipping costs
+def build_joint_model(cost_table, max_sodas):
+    from pulp import LpMinimize, LpProblem, LpVariable, lpSum
+
+    packages = cost_table['packages']
+    sizes = cost_table['sizes'].tolist()
+    package_prices = cost_table['prices'].tolist()
+    # Container preferences still weigh the price of the goods, as in the per-package model
+    weighted_prices = (cost_table['prices'] * cost_table['preferences']).tolist()
+    # dict.fromkeys keeps the stores in the order they first appear
+    stores = list(dict.fromkeys(store for store, item in packages))
+
+    prob = LpProblem("Minimize_Cost_Joint", LpMinimize)
+    x = LpVariable.dicts("amounts_to_buy", packages, 0, None, cat='Integer')
+    visit = LpVariable.dicts("visit", stores, cat='Binary')
+    # free_shipping[store] is 1 when the order at a threshold store is big enough to ship for free
+    threshold_stores = [store for store in stores if store in free_shipping_thresholds]
+    free_shipping = LpVariable.dicts("free_shipping", threshold_stores, cat='Binary')
+
+    # Objective: goods, plus one trip per visited store, plus one shipping fee per order
+    trip_cost = {store: cost_table['travel_distance'].get(store, 0) * travel_cost_per_mile for store in stores}
+    flat_shipping = {store: shipping_costs.get(store, 0) for store in stores if store not in free_shipping_thresholds}
+    prob += (lpSum([price * x[package] for package, price in zip(packages, weighted_prices)])
+             + lpSum([(trip_cost[store] + flat_shipping.get(store, 0)) * visit[store] for store in stores])
+             + lpSum([free_shipping_thresholds[store]['fee'] * (visit[store] - free_shipping[store]) for store in threshold_stores]))
+
+    # Constraint: The total number of sodas bought should equal the requested number
+    prob += lpSum([size * x[package] for package, size in zip(packages, sizes)]) == 0, "demand"
+    # Constraint: Packages can only be bought at a store that is visited (never more than max_sodas worth)
+    for i, (package, size) in enumerate(zip(packages, sizes)):
+        prob += x[package] <= -(-max(max_sodas, 1) // size) * visit[package[0]], f"visit_{i}"
+    # Constraint: Free shipping only counts for a visited store whose order reaches the threshold
+    for store in threshold_stores:
+        subtotal = lpSum([price * x[package] for package, price in zip(packages, package_prices) if package[0] == store])
+        prob += subtotal >= free_shipping_thresholds[store]['free_over'] * free_shipping[store], f"free_over_{store}"
+        prob += free_shipping[store] <= visit[store], f"free_needs_visit_{store}"
+    return prob, x, visit
+
+# From a customer's perspective:
+# - The per-package model adds the trip and the shipping fee to every single package, so buying 10 packs "pays" for the trip 10 times.
+# - This model gets it right: each store you visit costs one trip, and each delivery order costs one shipping fee.
+# - For stores like Cardenas it also knows that the fee disappears once your order reaches $80.
+# - One solve gives the true cheapest plan, so there is no need to re-solve and patch up the answer by hand.
+
+# Here's a step-by-step breakdown:
+# 1. **Packages**: How many of each package to buy, in whole numbers.
+# 2. **Visit Store**: A yes/no choice per store; saying yes costs the trip there (and any flat shipping fee).
+# 3. **Free Shipping**: A yes/no choice per threshold store, only allowed if the order at that store is big enough.
+# 4. **Linking**: You can only buy packages at a store you decided to visit.
+
+
+# Function to solve the quantities with the joint model, warm-starting each solve from the previous plan
+def _solve_joint(quantities, cost_table, extra_constraints):
+    from pulp import LpStatus, value
+
+    with span('build_model', model='joint'):
+        prob, x, visit = build_joint_model(cost_table, max(quantities, default=0))
+        for add_constraint in extra_constraints or []:
+            add_constraint(prob, x)
+    demand = prob.constraints['demand']
+    cbc = _cbc_command(warmStart=True)
+
+    plans = []
+    for num_sodas in quantities:
+        demand.changeRHS(num_sodas)
+        _solve_model(prob, cbc, num_sodas=num_sodas)
+        plan = summarize_shopping_plan(num_sodas, LpStatus[prob.status], value(prob.objective), _bought_packages(x), cost_table)
+        plan['stores_to_visit'] = {store for store, var in visit.items() if (var.varValue or 0) > 0.5} & plan['stores_to_visit']
+        plans.append(plan)
+        # The solution just found becomes the starting point of the next solve
+        for var in prob.variables():
+            if var.varValue is not None:
+                var.setInitialValue(var.varValue)
+    return plans
+
+# From a customer's perspective:
+# - Neighbouring quantities usually have very similar plans, so each solve starts from the previous answer instead of from scratch.
+
+
+# Function to build a dynamic-programming table of the cheapest way to buy every quantity up to max_sodas
+def build_dp_table(cost_table, max_sodas):
+    packages = cost_table['packages']
+    sizes = cost_table['sizes']
+    # Each package is weighted exactly as in the objective of build_shopping_model, so both give the same optimum
+    costs = cost_table['cost_per_soda']
+
+    # best[n] is the cheapest cost of buying exactly n sodas, choice[n] the package that was bought last to get there
+    best = np.full(max_sodas + 1, np.inf)
+    best[0] = 0.0
+    choice = np.full(max_sodas + 1, -1, dtype=np.int64)
+
+    # Among packages of the same size only the cheapest can ever be chosen, so large catalogs shrink to a few sizes
+    order = np.lexsort((costs, sizes))
+    first_of_size = np.ones(len(order), dtype=bool)
+    first_of_size[1:] = sizes[order][1:] != sizes[order][:-1]
+    # Packages that cannot be bought right now (infinite cost, e.g. out of stock) are left out
+    candidates = [p for p in order[first_of_size].tolist() if 0 < sizes[p] <= max(max_sodas, 1) and np.isfinite(costs[p])]
+
+    for p in candidates:
+        size = int(sizes[p])
+        cost = costs[p]
+        # Lay the table out in rows of `size` so each column holds the quantities n, n + size, n + 2 * size, ...
+        rows = -(-(max_sodas + 1) // size)
+        padded = np.full(rows * size, np.inf)
+        padded[:max_sodas + 1] = best
+        grid = padded.reshape(rows, size)
+        # Buying k more packages down a column costs k * cost, so a running minimum of (best - k * cost) finds the best start
+        k = np.arange(rows, dtype=float)[:, None] * cost
+        candidate = (np.minimum.accumulate(grid - k, axis=0) + k).ravel()[:max_sodas + 1]
+        # Only switch where this package is a real improvement, not a rounding wobble
+        improved = candidate < best - 1e-9
+        best = np.where(improved, candidate, best)
+        choice[improved] = p
+
+    return {
+        'cost_table': cost_table,
+        'packages': packages,
+        'sizes': sizes,
+        'costs': costs,
+        'best': best,
+        'choice': choice,
+    }
+
+# From a customer's perspective:
+# - Buying whole packages to hit an exact soda count is the classic "make change with coins" puzzle.
+# - Instead of asking a solver, we fill in a table: the cheapest way to get 1 soda, 2 sodas, ... all the way up to the biggest number you asked for.
+# - Once the table is filled, the answer for any smaller number is already in it, for free.
+
+# Here's a step-by-step breakdown:
+# 1. **Packages**: Every store and item becomes one package with a size (sodas) and the same cost weight the optimization model uses.
+# 2. **Start**: Buying 0 sodas costs nothing; every other amount starts out as "impossible".
+# 3. **Add Packages**: One package at a time, we check whether buying some number of it makes any amount cheaper.
+#    - Only the cheapest package of each size needs checking, since a pricier one of the same size never helps.
+#    - NumPy does this for all amounts at once, so there is no slow loop over every number of sodas.
+# 4. **Remember Choices**: For each amount we remember which package got us there, so the plan can be read back.
+
+
+# Function to read the shopping plan for one quantity out of a dynamic-programming table
+def solve_from_dp_table(dp_table, num_sodas):
+    bought = {}
+    # A negative number of sodas can never be bought (and must not index the table from the end)
+    objective = dp_table['best'][num_sodas] if num_sodas >= 0 else np.inf
+    if not np.isfinite(objective):
+        return summarize_shopping_plan(num_sodas, 'Infeasible', None, bought, dp_table['cost_table'])
+
+    # Walk back from num_sodas to zero, one remembered package at a time
+    remaining = num_sodas
+    while remaining > 0:
+        p = int(dp_table['choice'][remaining])
+        bought[p] = bought.get(p, 0.0) + 1
+        remaining -= dp_table['sizes'][p]
+    return summarize_shopping_plan(num_sodas, 'Optimal', float(objective), bought, dp_table['cost_table'])
+
+# From a customer's perspective:
+# - This looks up your number of sodas in the table and retraces which packages were bought to get there.
+
+
+# Function to determine the optimal shopping plans for many soda quantities at once
+def get_optimal_shopping_plans(quantities, extra_constraints=None, solver='auto', radius_miles=None, k_nearest=None,
+                               with_routes=False, home=None, model='per_package'):
+    quantities = [int(num_sodas) for num_sodas in quantities]
+    with span('get_optimal_shopping_plans', quantities=len(quantities), solver=solver, model=model):
+        return _get_optimal_shopping_plans(quantities, extra_constraints, solver, radius_miles, k_nearest, with_routes, home, model)
+
+
+def _get_optimal_shopping_plans(quantities, extra_constraints, solver, radius_miles, k_nearest, with_routes, home, model):
+    # The cost table does not depend on the quantity, and is only rebuilt when the data changes
+    cost_table = get_cost_table(radius_miles, k_nearest, home)
+
+    # The joint model has store and shipping choices, so it always needs the MILP solver
+    if model == 'joint':
+        if solver == 'dp':
+            raise ValueError("The DP solver cannot handle the joint model, use solver='pulp'")
+        plans = _solve_joint(quantities, cost_table, extra_constraints)
+    # With only the demand constraint the problem is a coin-change puzzle, and the DP table answers it exactly
+    elif solver == 'dp' or (solver == 'auto' and not extra_constraints):
+        if extra_constraints:
+            raise ValueError("The DP solver cannot handle extra constraints, use solver='pulp'")
+        max_sodas = max(0, max(quantities, default=0))
+        with span('dp_table', packages=len(cost_table['packages']), max_sodas=max_sodas):
+            dp_table = build_dp_table(cost_table, max_sodas)
+        with span('dp_lookup', quantities=len(quantities)):
+            plans = [solve_from_dp_table(dp_table, num_sodas) for num_sodas in quantities]
+    else:
+        plans = _solve_with_pulp(quantities, cost_table, extra_constraints)
+
+    # Each distinct set of stores is routed once; the route cache answers the rest
+    if with_routes:
+        with span('routing', plans=len(plans)):
+            for plan in plans:
+                routable = {store for store in plan['stores_to_visit'] if store in cost_table['store_coordinates']}
+                plan['route'] = plan_route(routable, cost_table['store_coordinates'], home=home) if len(routable) > 1 else None
+    return plans
+
+
+# Function to make the CBC solver command; while tracing, CBC also writes a log to read its statistics from
+def _cbc_command(**options):
+    from pulp import PULP_CBC_CMD
+
+    if trace_settings['enabled']:
+        options['logPath'] = os.path.join(tempfile.gettempdir(), f'soda-cbc-{os.getpid()}.log')
+    return PULP_CBC_CMD(msg=False, **options)
+
+
+# Function to read the node count, iterations and gap of the last solve from a CBC log
+def _read_cbc_log(path):
+    labels = {'Objective value:': 'objective', 'Lower bound:': 'lower_bound', 'Gap:': 'gap',
+              'Enumerated nodes:': 'nodes', 'Total iterations:': 'iterations'}
+    stats = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                for label, key in labels.items():
+                    if line.startswith(label):
+                        value = float(line[len(label):].split()[0])
+                        stats[key] = int(value) if key in ('nodes', 'iterations') else value
+    return stats
+
+
+# Function to solve a model once, recording its status, size, gap and node count in a span while tracing
+def _solve_model(prob, cbc, **attributes):
+    with span('cbc_solve', **attributes):
+        prob.solve(cbc)
+        if trace_settings['enabled']:
+            from pulp import LpStatus
+
+            stats = _read_cbc_log(cbc.optionsDict.get('logPath'))
+            # CBC only prints a gap when it stops early; a proven optimum has none left
+            if 'gap' not in stats and LpStatus[prob.status] == 'Optimal':
+                stats['gap'] = 0.0
+            annotate(status=LpStatus[prob.status], variables=prob.numVariables(), constraints=prob.numConstraints(),
+                     nonzeros=sum(len(constraint) for constraint in prob.constraints.values()),
+                     solve_seconds=prob.solutionTime, **stats)
+
+# From a customer's perspective:
+# - With tracing on, every solve also notes how big the model was, how many branches CBC explored and how close to proven best it got.
+
+
+# Function to solve the quantities with one PuLP model, changing only the demand between solves
+def _solve_with_pulp(quantities, cost_table, extra_constraints):
+    # Build one model and add the extra constraints
+    with span('build_model', model='per_package'):
+        prob, x = build_shopping_model(cost_table)
+        for add_constraint in extra_constraints or []:
+            add_constraint(prob, x)
+    demand = prob.constraints['demand']
+    cbc = _cbc_command()
+
+    plans = []
+    for num_sodas in quantities:
+        # Only the right-hand side of the demand constraint changes between solves
+        demand.changeRHS(num_sodas)
+        _solve_model(prob, cbc, num_sodas=num_sodas)
+        plans.append(extract_shopping_plan(num_sodas, prob, x, cost_table))
+    return plans
+
+# From a customer's perspective:
+# - Instead of typing one number at a time, you hand over a whole list (or range) of quantities, e.g. range(1, 5001).
+# - You get back one plan per quantity, in the same order, ready to be charted or saved.
+
+# Here's a step-by-step breakdown:
+# 1. **Cost Table**: The cost per soda is calculated once for all quantities, or reused from the cache.
+#    - radius_miles and k_nearest limit it to the stores near home, using the spatial index.
+# 2. **DP Table**: Normally one table up to the largest quantity answers every quantity exactly, with no solver at all.
+# 3. **Model Template**: If you pass extra_constraints (functions that add rules to the model), one PuLP model is built instead.
+#    - With model='joint', the model charges each trip and shipping fee once (see build_joint_model).
+# 4. **Re-solve**: For each quantity only the demand number is swapped in, and the same model is solved again quietly.
+# 5. **Plans**: Each answer is collected as a plan with amounts, stores to visit, status and objective value.
+# 6. **Routes**: With with_routes=True each plan also gets its driving route, solved once per distinct set of stores.
+
+
+# Function to find the best plan for one household: the main entry point of the library
+def optimize(demand, home=None, radius_miles=None, k_nearest=None, solver='auto', extra_constraints=None, with_route=True,
+             model='per_package'):
+    plan = get_optimal_shopping_plans([demand], extra_constraints=extra_constraints, solver=solver, radius_miles=radius_miles,
+                                      k_nearest=k_nearest, with_routes=with_route, home=home, model=model)[0]
+    return Plan.from_dict(plan)
+
+# From a customer's perspective:
+# - optimize(30) answers "what is the cheapest way to get 30 sodas?" without asking anything on the screen.
+# - home=(lat, lon) plans from another location without changing the built-in 'Home'.
+# - The answer is a Plan with only the items you actually need to buy.
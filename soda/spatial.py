@@ -0,0 +1,175 @@
+import heapq
+
+import numpy as np
+
+from .catalog import get_catalog
+from .data import coordinates
+
+
+# Function to turn latitudes and longitudes into points on a unit sphere (x, y, z)
+def to_unit_vectors(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+# Function to build a KD-tree over locations, on the unit sphere so distances work anywhere on Earth
+def build_spatial_index(lats, lons, leaf_size=32):
+    points = to_unit_vectors(lats, lons).reshape(-1, 3)
+    # The tree reorders the points so every node covers one contiguous slice of `order`
+    order = np.arange(len(points))
+    nodes = {'start': [], 'end': [], 'low': [], 'high': [], 'left': [], 'right': []}
+
+    # Build the nodes with an explicit stack instead of recursion
+    stack = [(0, len(points), None, None)]
+    while stack:
+        start, end, parent, side = stack.pop()
+        node = len(nodes['start'])
+        if parent is not None:
+            nodes[side][parent] = node
+        block = points[order[start:end]]
+        nodes['start'].append(start)
+        nodes['end'].append(end)
+        nodes['low'].append(block.min(axis=0) if end > start else np.full(3, np.inf))
+        nodes['high'].append(block.max(axis=0) if end > start else np.full(3, -np.inf))
+        nodes['left'].append(-1)
+        nodes['right'].append(-1)
+        if end - start <= leaf_size:
+            continue
+        # Split the widest side of the bounding box at its median
+        dim = int(np.argmax(nodes['high'][node] - nodes['low'][node]))
+        mid = (start + end) // 2
+        order[start:end] = order[start:end][np.argpartition(block[:, dim], mid - start)]
+        stack.append((start, mid, node, 'left'))
+        stack.append((mid, end, node, 'right'))
+
+    return {
+        'points': points,
+        'order': order,
+        'start': np.array(nodes['start']),
+        'end': np.array(nodes['end']),
+        'low': np.array(nodes['low']),
+        'high': np.array(nodes['high']),
+        'left': np.array(nodes['left']),
+        'right': np.array(nodes['right']),
+    }
+
+# From a customer's perspective:
+# - With thousands of stores across the country, most of them are far too far away to matter.
+# - This index sorts the stores into nested "boxes" of nearby stores, like a filing cabinet organised by area.
+# - A question like "which stores are within 10 miles?" then only opens the few boxes near your home.
+
+
+# Convert between miles along the Earth's surface and straight-line (chord) distance on the unit sphere
+def _miles_to_chord(miles):
+    return 2 * np.sin(np.minimum(np.asarray(miles, dtype=float) / 3958.8, np.pi) / 2)
+
+
+def _chord_to_miles(chord):
+    return 2 * 3958.8 * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0.0, 1.0))
+
+
+# Function to measure how far a point is from the bounding box of each node (0 if inside)
+def _box_distance(index, node, point):
+    gap = np.maximum(index['low'][node] - point, 0) + np.maximum(point - index['high'][node], 0)
+    return float(np.sqrt(np.dot(gap, gap)))
+
+
+# Function to find every location within radius_miles of (lat, lon); returns (indices, miles) sorted by distance
+def query_radius(index, lat, lon, radius_miles):
+    point = to_unit_vectors(lat, lon)
+    limit = float(_miles_to_chord(radius_miles))
+    found, chords = [], []
+    stack = [0] if len(index['points']) else []
+    while stack:
+        node = stack.pop()
+        # Skip any box that lies entirely outside the radius
+        if _box_distance(index, node, point) > limit:
+            continue
+        if index['left'][node] < 0:
+            members = index['order'][index['start'][node]:index['end'][node]]
+            chord = np.linalg.norm(index['points'][members] - point, axis=1)
+            keep = chord <= limit
+            found.append(members[keep])
+            chords.append(chord[keep])
+        else:
+            stack.extend([index['left'][node], index['right'][node]])
+    found = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+    chords = np.concatenate(chords) if chords else np.empty(0)
+    by_distance = np.argsort(chords, kind='stable')
+    return found[by_distance], _chord_to_miles(chords[by_distance])
+
+
+# Function to find the k locations nearest to (lat, lon); returns (indices, miles) sorted by distance
+def query_nearest(index, lat, lon, k):
+    point = to_unit_vectors(lat, lon)
+    best = np.empty(0, dtype=np.int64)
+    best_chord = np.empty(0)
+    # Visit the boxes closest to the point first, and stop once no box can beat the current k-th best
+    heap = [(0.0, 0)] if len(index['points']) and k > 0 else []
+    while heap:
+        box_distance, node = heapq.heappop(heap)
+        if len(best) == k and box_distance > best_chord[-1]:
+            break
+        if index['left'][node] < 0:
+            members = index['order'][index['start'][node]:index['end'][node]]
+            chord = np.linalg.norm(index['points'][members] - point, axis=1)
+            best = np.concatenate([best, members])
+            best_chord = np.concatenate([best_chord, chord])
+            keep = np.argsort(best_chord, kind='stable')[:k]
+            best, best_chord = best[keep], best_chord[keep]
+        else:
+            for child in (index['left'][node], index['right'][node]):
+                heapq.heappush(heap, (_box_distance(index, child, point), child))
+    return best, _chord_to_miles(best_chord)
+
+# From a customer's perspective:
+# - query_radius answers "which stores are within 10 miles of home?".
+# - query_nearest answers "which 20 stores are closest to home?".
+# - Both give back the stores sorted from nearest to farthest, with their distances in miles.
+
+
+
+
+# Cache of the spatial index over the catalog's stores, keyed on the catalog version
+_store_index_cache = {}
+
+
+# Function to get the spatial index over the stores of the current catalog
+def get_store_index():
+    catalog = get_catalog()
+    if catalog['version'] not in _store_index_cache:
+        _store_index_cache.clear()
+        store_lat = np.asarray(catalog['store_lat'])
+        store_lon = np.asarray(catalog['store_lon'])
+        # Only stores with coordinates go into the index
+        located = np.flatnonzero(~np.isnan(store_lat))
+        index = build_spatial_index(store_lat[located], store_lon[located])
+        index['store_ids'] = located
+        _store_index_cache[catalog['version']] = index
+    return _store_index_cache[catalog['version']]
+
+
+# Function to pick the stores worth considering from home: within radius_miles and/or the k_nearest ones
+def find_candidate_stores(radius_miles=None, k_nearest=None, home=None):
+    catalog = get_catalog()
+    store_lat = np.asarray(catalog['store_lat'])
+    if radius_miles is None and k_nearest is None:
+        return np.arange(len(store_lat))
+
+    index = get_store_index()
+    home_lat, home_lon = home or coordinates['Home']
+    if k_nearest is not None:
+        found, miles = query_nearest(index, home_lat, home_lon, k_nearest)
+        if radius_miles is not None:
+            found = found[miles <= radius_miles]
+    else:
+        found, miles = query_radius(index, home_lat, home_lon, radius_miles)
+    # Stores without coordinates (e.g. delivery only) cannot be ruled out by distance, so they always stay in
+    unlocated = np.flatnonzero(np.isnan(store_lat))
+    return np.union1d(index['store_ids'][found], unlocated)
+
+# From a customer's perspective:
+# - Before working out any costs, we narrow the store list down to the ones near your home.
+# - radius_miles keeps every store within that many miles; k_nearest keeps only the closest few; with both, you get the closest few within the radius.
+# - Everything after this step (cost table, optimization) only ever sees the stores that made the cut, so it stays small and fast.
@@ -0,0 +1,258 @@
+import json
+import math
+
+import numpy as np
+
+from .costs import get_cost_table
+from .data import free_shipping_thresholds, shipping_costs, travel_cost_per_mile
+from .profiling import span
+from .solver import _cbc_command, _solve_model
+
+
+# Function to lay out the price of every package in every period, starting from the cost table's prices
+def period_price_matrix(cost_table, num_periods, period_prices=None):
+    if isinstance(period_prices, np.ndarray):
+        return np.asarray(period_prices, dtype=float).reshape(num_periods, len(cost_table['packages']))
+    prices = np.tile(np.asarray(cost_table['prices'], dtype=float), (num_periods, 1))
+    index = {package: i for i, package in enumerate(cost_table['packages'])}
+    # Each period can override some prices, e.g. a forecast sale; None means the item is not sold that period
+    for t, overrides in enumerate(period_prices or []):
+        for package, price in overrides.items():
+            prices[t, index[package]] = np.inf if price is None else price
+    return prices
+
+# From a customer's perspective:
+# - Prices change from week to week: a 12-pack might be on sale in week 3 and back to normal in week 4.
+# - period_prices lists those changes per week, as {(store, item): price}; anything not listed keeps its usual price.
+
+
+# Function to drop packages that another package at the same store beats in every period
+def _undominated_packages(cost_table, prices):
+    packages = cost_table['packages']
+    sizes = cost_table['sizes']
+    ounces = np.asarray(cost_table['fluid_ounces'], dtype=float)
+    preferences = cost_table['preferences']
+    # Packages are interchangeable when they hold the same number and size of sodas, in an equally preferred container
+    groups = {}
+    for i, (store, item) in enumerate(packages):
+        groups.setdefault((store, int(sizes[i]), round(ounces[i] / sizes[i], 3), float(preferences[i])), []).append(i)
+    keep = []
+    for members in groups.values():
+        for i in members:
+            # i is dropped if some other package is never dearer and is cheaper at least once (ties keep the first)
+            beaten = any(np.all(prices[:, j] <= prices[:, i]) and (np.any(prices[:, j] < prices[:, i]) or j < i)
+                         for j in members if j != i)
+            if not beaten and np.isfinite(prices[:, i]).any():
+                keep.append(i)
+    return sorted(keep)
+
+# From a customer's perspective:
+# - Big price lists often have the same 12-pack under several brands; if one is never more expensive, the others can be ignored.
+# - This makes long plans with hundreds of items much faster to solve, without changing the answer.
+
+
+# Function to build the time-expanded stock-up model for a window of periods
+def build_stockup_model(cost_table, demands, capacity_oz, prices, candidates, initial_stock, max_trips=None, first_period=0):
+    from pulp import LpMinimize, LpProblem, LpVariable, lpSum
+
+    packages = cost_table['packages']
+    sizes = cost_table['sizes']
+    ounces = np.asarray(cost_table['fluid_ounces'], dtype=float)
+    # Sodas are stocked by their size in ounces; 12oz cans and 2L bottles take different room in the pantry
+    soda_ounces, soda_class = np.unique(np.round(ounces / sizes, 3), return_inverse=True)
+    periods = [first_period + t for t in range(len(demands))]
+    stores = list(dict.fromkeys(packages[i][0] for i in candidates))
+    threshold_stores = [store for store in stores if store in free_shipping_thresholds]
+    trip_cost = {store: cost_table['travel_distance'].get(store, 0) * travel_cost_per_mile
+                 + (shipping_costs.get(store, 0) if store not in free_shipping_thresholds else 0) for store in stores}
+
+    prob = LpProblem("Minimize_Cost_Stock_Up", LpMinimize)
+    # x[i, t]: packages of i bought in period t; never more than fit in the pantry at once
+    x = {}
+    for i in candidates:
+        most = math.floor(capacity_oz / ounces[i])
+        for t, period in enumerate(periods):
+            if most > 0 and np.isfinite(prices[t, i]):
+                x[i, period] = LpVariable(f"buy_{i}_{period}", 0, most, cat='Integer')
+    visit = {(store, period): LpVariable(f"visit_{s}_{period}", cat='Binary') for s, store in enumerate(stores) for period in periods}
+    free_shipping = {(store, period): LpVariable(f"free_{s}_{period}", cat='Binary')
+                     for s, store in enumerate(threshold_stores) for period in periods}
+    # stock[c, t]: sodas of size class c left at the end of period t; drink[c, t]: sodas of class c drunk in period t
+    classes = range(len(soda_ounces))
+    stock = {(c, period): LpVariable(f"stock_{c}_{period}", 0) for c in classes for period in periods}
+    drink = {(c, period): LpVariable(f"drink_{c}_{period}", 0) for c in classes for period in periods}
+
+    # Objective: goods (weighted by container preference, as in the other models), one trip per visit, shipping per order
+    weighted_prices = prices * cost_table['preferences']
+    prob += (lpSum([weighted_prices[period - first_period, i] * var for (i, period), var in x.items()])
+             + lpSum([trip_cost[store] * var for (store, period), var in visit.items()])
+             + lpSum([free_shipping_thresholds[store]['fee'] * (visit[store, period] - var)
+                      for (store, period), var in free_shipping.items()]))
+
+    bought = {(c, period): [] for c in classes for period in periods}
+    spent = {key: [] for key in free_shipping}
+    for (i, period), var in x.items():
+        bought[soda_class[i], period].append(int(sizes[i]) * var)
+        if (packages[i][0], period) in spent:
+            spent[packages[i][0], period].append(prices[period - first_period, i] * var)
+        # Packages can only be bought at a store visited that period
+        prob += var <= var.upBound * visit[packages[i][0], period], f"visit_{i}_{period}"
+
+    for t, period in enumerate(periods):
+        previous = {c: (stock[c, period - 1] if t > 0 else float(initial_stock[c])) for c in classes}
+        # Demand: the sodas drunk this period, of any size
+        prob += lpSum([drink[c, period] for c in classes]) == demands[t], f"demand_{period}"
+        for c in classes:
+            # Stock balance: what was left, plus what was bought, minus what was drunk
+            prob += stock[c, period] == previous[c] + lpSum(bought[c, period]) - drink[c, period], f"balance_{c}_{period}"
+        # Storage: right after shopping, everything on hand must fit in the pantry
+        prob += lpSum([soda_ounces[c] * (previous[c] + lpSum(bought[c, period])) for c in classes]) <= capacity_oz, \
+            f"capacity_{period}"
+        for store in threshold_stores:
+            prob += lpSum(spent[store, period]) >= free_shipping_thresholds[store]['free_over'] * free_shipping[store, period], f"free_over_{store}_{period}"
+            prob += free_shipping[store, period] <= visit[store, period], f"free_needs_visit_{store}_{period}"
+    # Trip budget: the number of store visits over the whole window
+    if max_trips is not None:
+        prob += lpSum(visit.values()) <= max_trips, "trip_budget"
+
+    return prob, {'x': x, 'visit': visit, 'free_shipping': free_shipping, 'stock': stock, 'soda_ounces': soda_ounces,
+                  'soda_class': soda_class}
+
+# From a customer's perspective:
+# - Instead of "the cheapest 30 sodas today", this plans a whole season of weekly shopping at once.
+# - Buying ahead during a sale is worth it only if the sodas fit in your pantry, so the pantry size (in fluid ounces) is a limit.
+# - Every store visit counts against a trip budget, e.g. "at most 20 store runs this quarter".
+
+# Here's a step-by-step breakdown:
+# 1. **Buy**: How many of each package to buy in each week, in whole numbers.
+# 2. **Visit**: A yes/no choice per store and week; each yes costs the trip (and any flat shipping fee).
+# 3. **Stock**: What is left in the pantry at the end of each week, per soda size.
+# 4. **Drink**: Each week's demand is drunk from the pantry, in any mix of sizes.
+# 5. **Pantry**: Right after shopping, the pantry can hold at most capacity_oz fluid ounces.
+# 6. **Trip Budget**: The total number of store visits is capped.
+
+
+# Function to plan weekly shopping over a horizon, as one model or as rolling windows that warm-start each other
+def plan_stock_up(demands, capacity_oz, period_prices=None, max_trips=None, window=None, step=None, time_limit=None,
+                  radius_miles=None, k_nearest=None, home=None):
+    from pulp import LpStatus
+
+    demands = [int(d) for d in demands]
+    num_periods = len(demands)
+    cost_table = get_cost_table(radius_miles, k_nearest, home)
+    prices = period_price_matrix(cost_table, num_periods, period_prices)
+    candidates = _undominated_packages(cost_table, prices)
+    # Without a window the whole horizon is one model; otherwise solve `window` periods and keep the first `step`
+    window = min(window or num_periods, num_periods)
+    step = min(step or window, window)
+    options = {'warmStart': True}
+    if time_limit is not None:
+        options['timeLimit'] = time_limit
+
+    stock = None
+    trips_left = max_trips
+    previous_values = {}
+    periods = []
+    status = 'Optimal'
+    start = 0
+    with span('plan_stock_up', periods=num_periods, packages=len(candidates), window=window, step=step):
+        while start < num_periods:
+            stop = min(start + window, num_periods)
+            keep = num_periods - start if stop == num_periods else step
+            # Share the remaining trips fairly between this window and the periods after it
+            budget = None if trips_left is None else math.ceil(trips_left * (stop - start) / (num_periods - start))
+            prob, variables = build_stockup_model(cost_table, demands[start:stop], capacity_oz, prices[start:stop], candidates,
+                                                  stock if stock is not None else _empty_stock(cost_table), budget, start)
+            # Periods that the previous window already planned start from that plan
+            for name in ['x', 'visit', 'free_shipping']:
+                for key, var in variables[name].items():
+                    if (name, key) in previous_values:
+                        var.setInitialValue(previous_values[name, key])
+            _solve_model(prob, _cbc_command(**options), periods=f'{start}-{stop - 1}')
+            status = LpStatus[prob.status]
+            if status != 'Optimal':
+                break
+            previous_values = {(name, key): round(var.varValue or 0) for name in ['x', 'visit', 'free_shipping']
+                               for key, var in variables[name].items()}
+            committed = range(start, start + keep)
+            bought = {}
+            for (i, period), var in variables['x'].items():
+                if (var.varValue or 0) > 0.5:
+                    bought.setdefault(period, {})[cost_table['packages'][i]] = float(round(var.varValue))
+            periods.extend(_describe_period(period, demands[period], bought.get(period, {}), prices[period], cost_table, variables)
+                           for period in committed)
+            last = committed[-1]
+            stock = np.array([variables['stock'][c, last].varValue or 0.0 for c in range(len(variables['soda_ounces']))])
+            if trips_left is not None:
+                trips_left -= sum(len(period['stores_to_visit']) for period in periods[-keep:])
+            start += keep
+
+    return {
+        'status': status,
+        'objective': sum(period['objective'] for period in periods),
+        'total_spent': sum(period['spent'] for period in periods),
+        'trips': sum(len(period['stores_to_visit']) for period in periods),
+        'periods': periods,
+    }
+
+# From a customer's perspective:
+# - plan_stock_up([24] * 52, capacity_oz=2000, max_trips=26) plans a year of 24 sodas a week with a 2000 oz pantry and 26 trips.
+# - For a long horizon, window=8, step=4 plans eight weeks at a time but only commits to the first four, then moves on.
+#   - Each window starts from the previous window's plan (a warm start), so the solver has a good answer from the beginning.
+#   - The pantry stock and the unused trips are carried over from one window to the next.
+
+
+# Function to turn a stock-up plan into plain lists and dictionaries that can be written as JSON
+def stock_up_to_dict(plan):
+    return {**plan, 'periods': [{**period, 'amounts_to_buy': [{'store': store, 'item': item, 'packages': amount}
+                                                               for (store, item), amount in period['amounts_to_buy'].items()]}
+                                for period in plan['periods']]}
+
+
+# Function to read per-period prices from JSON lines like {"period": 3, "store": "Vons", "sku": "7.5oz_can_6pack", "price": 2.99}
+def read_period_prices(path, num_periods):
+    period_prices = [{} for _ in range(num_periods)]
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if row['period'] < num_periods:
+                    period_prices[row['period']][row['store'], row['sku']] = row.get('price')
+    return period_prices
+
+
+# Function to start with an empty pantry: one zero per soda size class
+def _empty_stock(cost_table):
+    ounces = np.asarray(cost_table['fluid_ounces'], dtype=float)
+    return np.zeros(len(np.unique(np.round(ounces / cost_table['sizes'], 3))))
+
+
+# Function to read one period of a solved stock-up model into a plan
+def _describe_period(period, demand, amounts_to_buy, prices, cost_table, variables):
+    packages = cost_table['packages']
+    stores_to_visit = sorted(store for (store, p), var in variables['visit'].items() if p == period and (var.varValue or 0) > 0.5)
+
+    index = {package: i for i, package in enumerate(packages)}
+    goods = sum(amount * prices[index[package]] for package, amount in amounts_to_buy.items())
+    weighted_goods = sum(amount * prices[index[package]] * cost_table['preferences'][index[package]]
+                         for package, amount in amounts_to_buy.items())
+    trips = sum(cost_table['travel_distance'].get(store, 0) * travel_cost_per_mile for store in stores_to_visit)
+    shipping = 0.0
+    for store in stores_to_visit:
+        if store in free_shipping_thresholds:
+            if (variables['free_shipping'][store, period].varValue or 0) < 0.5:
+                shipping += free_shipping_thresholds[store]['fee']
+        else:
+            shipping += shipping_costs.get(store, 0)
+
+    stock = [variables['stock'][c, period].varValue or 0.0 for c in range(len(variables['soda_ounces']))]
+    return {
+        'period': period,
+        'demand': demand,
+        'amounts_to_buy': amounts_to_buy,
+        'stores_to_visit': stores_to_visit,
+        'spent': goods + trips + shipping,
+        'objective': weighted_goods + trips + shipping,
+        'stock_sodas': float(sum(stock)),
+        'stock_oz': float(np.dot(stock, variables['soda_ounces'])),
+    }
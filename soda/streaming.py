@@ -0,0 +1,197 @@
+import json
+import sys
+import time
+
+import numpy as np
+
+from .costs import get_cost_table, update_cost_table_rows
+from .solver import build_dp_table, solve_from_dp_table
+
+
+# Function to read price/stock deltas as JSON lines from a file (optionally following it like `tail -f`) or stdin
+def iter_price_deltas(path=None, follow=False, poll_interval=0.2):
+    for line in _iter_stream_lines(path, follow, poll_interval):
+        yield json.loads(line)
+
+
+# Function to read the non-blank lines of a file or stdin, optionally waiting for more at the end like `tail -f`
+def _iter_stream_lines(path=None, follow=False, poll_interval=0.2):
+    f = sys.stdin if path in (None, '-') else open(path)
+    try:
+        while True:
+            line = f.readline()
+            if not line:
+                # At the end of the file: wait for more lines when following, otherwise stop
+                if follow and f is not sys.stdin:
+                    time.sleep(poll_interval)
+                    continue
+                return
+            if line.strip():
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# From a customer's perspective:
+# - Each line is one change, for example {"store": "Vons", "sku": "7.5oz_can_6pack", "price": 2.99}.
+# - Items can also go out of stock and come back: {"store": "Vons", "sku": "7.5oz_can_6pack", "in_stock": false}.
+
+
+# Function to set up the standing queries: one plan per demand, kept up to date as prices change
+def start_price_stream(demands, radius_miles=None, k_nearest=None, home=None):
+    shared = get_cost_table(radius_miles, k_nearest, home)
+    # Work on a private copy, since the stream changes prices in place
+    cost_table = dict(shared)
+    for key in ['prices', 'cost_per_soda', 'shipping_costs']:
+        cost_table[key] = shared[key].copy()
+    demands = sorted(set(int(demand) for demand in demands))
+    dp_table = build_dp_table(cost_table, max(demands, default=0))
+    return {
+        'cost_table': cost_table,
+        'row_of': {package: row for row, package in enumerate(cost_table['packages'])},
+        # Last known prices are kept so an item that comes back in stock gets its price back
+        'listed_prices': cost_table['prices'].copy(),
+        'in_stock': np.ones(len(cost_table['packages']), dtype=bool),
+        'plans': {demand: solve_from_dp_table(dp_table, demand) for demand in demands},
+    }
+
+
+# Function to decide whether a changed package could change the plan for one demand
+def _may_change_plan(cost_table, plan, row, old_cost, best_ratio):
+    new_cost = cost_table['cost_per_soda'][row]
+    package = cost_table['packages'][row]
+    # A package the plan buys: any change to it can change the best mix
+    if plan['amounts_to_buy'].get(package, 0) > 0:
+        return True
+    # A demand with no solution yet can only be helped by a package that is now available
+    if plan['objective'] is None:
+        return np.isfinite(new_cost)
+    # A package the plan does not buy that got dearer can never make the plan better
+    if not new_cost < old_cost:
+        return False
+    # Reduced-cost test: any plan using this package at least once costs at least
+    # its cost plus the cheapest possible price per soda (best_ratio) for the rest of the demand
+    lower_bound = new_cost + best_ratio * max(plan['num_sodas'] - cost_table['sizes'][row], 0)
+    return lower_bound < plan['objective'] - 1e-9
+
+
+# Function to describe what changed between two plans
+def diff_plans(before, after):
+    old = {package: amount for package, amount in before['amounts_to_buy'].items() if amount > 0}
+    new = {package: amount for package, amount in after['amounts_to_buy'].items() if amount > 0}
+    changes = []
+    for package in sorted(set(old) | set(new)):
+        if old.get(package, 0) != new.get(package, 0):
+            changes.append({'store': package[0], 'item': package[1],
+                            'before': old.get(package, 0), 'after': new.get(package, 0)})
+    return {
+        'demand': after['num_sodas'],
+        'objective_before': before['objective'],
+        'objective_after': after['objective'],
+        'changes': changes,
+        'stores_to_visit': sorted(after['stores_to_visit']),
+    }
+
+
+# Function to apply one price or stock change and re-solve only the plans it can affect; returns the plan diffs
+def apply_price_delta(state, delta):
+    _check_price_delta(delta)
+    cost_table = state['cost_table']
+    row = state['row_of'].get((delta['store'], delta['sku']))
+    if row is None:
+        return None
+
+    # Update the remembered price and the stock flag, then recompute just this row
+    if 'price' in delta:
+        state['listed_prices'][row] = float(delta['price'])
+    if 'in_stock' in delta:
+        state['in_stock'][row] = bool(delta['in_stock'])
+    old_cost = cost_table['cost_per_soda'][row]
+    update_cost_table_rows(cost_table, [row], [state['listed_prices'][row]])
+    if not state['in_stock'][row]:
+        cost_table['cost_per_soda'][row] = np.inf
+
+    # The cheapest price per soda over the whole table is worked out once per change, not once per plan
+    costs = cost_table['cost_per_soda']
+    finite = np.isfinite(costs)
+    best_ratio = np.min(costs[finite] / cost_table['sizes'][finite]) if finite.any() else np.inf
+
+    # Only plans that this change could improve or break are solved again, all from one DP table
+    affected = [demand for demand, plan in state['plans'].items()
+                if _may_change_plan(cost_table, plan, row, old_cost, best_ratio)]
+    diffs = []
+    if affected:
+        dp_table = build_dp_table(cost_table, max(affected))
+        for demand in affected:
+            before = state['plans'][demand]
+            after = solve_from_dp_table(dp_table, demand)
+            state['plans'][demand] = after
+            diff = diff_plans(before, after)
+            if diff['changes'] or diff['objective_before'] != diff['objective_after']:
+                diffs.append(diff)
+    return diffs
+
+# From a customer's perspective:
+# - When a price changes, we don't redo everything: only the plans that could actually be affected.
+# - A plan is redone if it buys the changed item, or if the item got cheap enough that it might now be part of a better deal.
+# - A price going up on something a plan doesn't buy can never change that plan, so it is skipped.
+
+
+# Function to check that a change is well formed before any of it is applied; raises ValueError if not
+def _check_price_delta(delta):
+    if not isinstance(delta, dict):
+        raise ValueError("a change must be a JSON object")
+    if not isinstance(delta.get('store'), str) or not isinstance(delta.get('sku'), str):
+        raise ValueError("a change needs a store and a sku")
+    if 'price' in delta:
+        price = delta['price']
+        try:
+            valid = not isinstance(price, bool) and np.isfinite(float(price)) and float(price) >= 0
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValueError(f"price must be a number of at least 0, not {price!r}")
+    if 'in_stock' in delta and not isinstance(delta['in_stock'], bool):
+        raise ValueError(f"in_stock must be true or false, not {delta['in_stock']!r}")
+
+
+# Function to run the long-running price stream: read deltas, keep the plans current and write the plan diffs
+def run_price_stream(demands, source=None, output=None, follow=False, radius_miles=None, k_nearest=None, home=None):
+    output = output or sys.stdout
+    state = start_price_stream(demands, radius_miles, k_nearest, home)
+    latencies = []
+    errors = 0
+    for line in _iter_stream_lines(source, follow=follow):
+        # A bad line is reported like any other change and the stream goes on
+        try:
+            delta = json.loads(line)
+            start = time.perf_counter()
+            diffs = apply_price_delta(state, delta)
+        except ValueError as e:
+            errors += 1
+            error = f"invalid JSON: {e}" if isinstance(e, json.JSONDecodeError) else str(e)
+            output.write(json.dumps({'line': line.rstrip('\n'), 'error': error}) + '\n')
+            output.flush()
+            continue
+        latency_ms = (time.perf_counter() - start) * 1000
+        latencies.append(latency_ms)
+        if diffs is None:
+            event = {'delta': delta, 'error': 'unknown store or sku', 'latency_ms': latency_ms}
+        else:
+            event = {'delta': delta, 'diffs': diffs, 'latency_ms': latency_ms}
+        output.write(json.dumps(event) + '\n')
+        output.flush()
+
+    return {
+        'updates': len(latencies),
+        'errors': errors,
+        'p50_latency_ms': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'p99_latency_ms': float(np.percentile(latencies, 99)) if latencies else 0.0,
+        'max_latency_ms': float(np.max(latencies)) if latencies else 0.0,
+    }
+
+# From a customer's perspective:
+# - This keeps running while prices change during the day, instead of you running the whole program again.
+# - For every change it writes one line: the change, which plans changed and how, and how long the update took.
+# - A line that cannot be read, or has no store or a missing price, gets an error line instead, and the stream keeps running.
+# - When the input ends, you get a summary of the update-to-plan times (typical, worst 1%, and slowest).
@@ -0,0 +1,198 @@
+import csv
+import json
+import os
+
+from .costs import get_cost_table
+from .plan import Plan
+from .solver import get_optimal_shopping_plans
+
+
+# Columns of the CSV and Arrow outputs: one row per package bought (a plan with nothing to buy gets one empty row)
+PLAN_COLUMNS = ['num_sodas', 'status', 'objective', 'store', 'item', 'packages', 'stores_to_visit', 'total_cost_cardenas',
+                'route_distance']
+# File extensions that choose the output format when none is given
+PLAN_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.arrow': 'arrow', '.feather': 'arrow', '.txt': 'text'}
+
+
+# Function to turn one plan into flat rows for the CSV and Arrow outputs
+def plan_rows(plan):
+    shared = {
+        'num_sodas': plan.num_sodas,
+        'status': plan.status,
+        'objective': plan.objective,
+        'stores_to_visit': ';'.join(plan.stores_to_visit),
+        'total_cost_cardenas': plan.total_cost_cardenas,
+        'route_distance': plan.route['distance'] if plan.route else None,
+    }
+    if not plan.amounts_to_buy:
+        return [{**shared, 'store': None, 'item': None, 'packages': None}]
+    return [{**shared, 'store': store, 'item': item, 'packages': amount} for (store, item), amount in plan.amounts_to_buy.items()]
+
+
+# Function to render one plan as the familiar text report
+def render_plan_text(plan, cost_table, package_rows=None):
+    if package_rows is None:
+        package_rows = {package: i for i, package in enumerate(cost_table['packages'])}
+    lines = [f"Plan for {plan.num_sodas} sodas ({plan.status}):"]
+
+    # The optimal amounts to buy from each store
+    lines.append("Amounts to buy (in number of sodas):")
+    for (store, item), amount in plan.amounts_to_buy.items():
+        i = package_rows[store, item]
+        container_type = cost_table['containers'][i]
+        travel_distance = cost_table['travel_distance'].get(store, 'N/A')
+        total_cost = amount * cost_table['prices'][i]
+        fluid_ounce_per_soda = cost_table['fluid_ounces'][i] / cost_table['sizes'][i]
+        lines.append(f"{store} - {item}: {amount * cost_table['sizes'][i]:.0f} sodas, {container_type} container, Total Cost: ${total_cost:.2f}, Travel Distance: {travel_distance} miles, Fluid Ounces per Soda: {fluid_ounce_per_soda:.2f} oz")
+
+    # The total cost for Cardenas if any sodas are bought from there
+    if plan.total_cost_cardenas > 0:
+        lines.append(f"Total cost for Cardenas including shipping: ${plan.total_cost_cardenas:.2f}")
+
+    # The route, if the plan takes more than one store and was planned with one
+    if len(plan.stores_to_visit) > 1 and plan.route:
+        lines.append("\nOptimized route for visiting multiple stores:")
+        lines.append('Route:')
+        lines.append('Route for vehicle 0:')
+        lines.append(' ->'.join(' {}'.format(name) for name in plan.route['route']))
+        lines.append('Distance of the route: {:.2f} miles'.format(plan.route['distance']))
+    return '\n'.join(lines) + '\n'
+
+# From a customer's perspective:
+# - This is the same report the program has always printed: what to buy where, what it costs, and the route.
+# - It is now just one of the output formats, next to CSV, JSON lines and Arrow.
+
+
+# Function to open a plan writer on a file path or an open file (e.g. sys.stdout); the format follows the extension if not given
+def open_plan_writer(path, format=None, batch_size=1000, cost_table=None):
+    own_file = isinstance(path, (str, os.PathLike))
+    if format is None:
+        format = PLAN_FORMATS.get(os.path.splitext(path)[1].lower()) if own_file else 'text'
+    if format not in _BATCH_WRITERS:
+        raise ValueError(f"Unsupported plan output: {path} (use .csv, .jsonl, .arrow or .txt, or pass format=)")
+
+    writer = {'format': format, 'batch': [], 'batch_size': batch_size, 'plans': 0, 'rows': 0, 'batches': 0,
+              'own_file': own_file}
+    if format == 'arrow':
+        # Arrow output is optional and needs pyarrow
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Writing Arrow plan files requires pyarrow (pip install pyarrow)") from e
+        writer['file'] = open(path, 'wb') if own_file else path
+        writer['schema'] = pa.schema([('num_sodas', pa.int64()), ('status', pa.string()), ('objective', pa.float64()),
+                                      ('store', pa.string()), ('item', pa.string()), ('packages', pa.float64()),
+                                      ('stores_to_visit', pa.string()), ('total_cost_cardenas', pa.float64()),
+                                      ('route_distance', pa.float64())])
+        writer['arrow'] = pa.ipc.new_file(writer['file'], writer['schema'])
+    else:
+        writer['file'] = open(path, 'w', newline='') if own_file else path
+    if format == 'csv':
+        writer['csv'] = csv.DictWriter(writer['file'], fieldnames=PLAN_COLUMNS)
+        writer['csv'].writeheader()
+    if format == 'text':
+        writer['cost_table'] = cost_table or get_cost_table()
+        writer['package_rows'] = {package: i for i, package in enumerate(writer['cost_table']['packages'])}
+    return writer
+
+
+# Function to add one plan (a Plan, or a plan dictionary from get_optimal_shopping_plans) to a writer
+def write_plan(writer, plan):
+    if isinstance(plan, dict):
+        plan = Plan.from_dict(plan)
+    writer['batch'].append(plan)
+    if len(writer['batch']) >= writer['batch_size']:
+        flush_plan_writer(writer)
+
+
+# Function to write the plans waiting in a writer's batch to its file
+def flush_plan_writer(writer):
+    if writer['batch']:
+        writer['rows'] += _BATCH_WRITERS[writer['format']](writer, writer['batch'])
+        writer['plans'] += len(writer['batch'])
+        writer['batches'] += 1
+        writer['batch'] = []
+    writer['file'].flush()
+
+
+# Function to write the last batch, finish the file and return how much was written
+def close_plan_writer(writer):
+    flush_plan_writer(writer)
+    if writer['format'] == 'arrow':
+        writer['arrow'].close()
+    if writer['own_file']:
+        writer['file'].close()
+    return {'format': writer['format'], 'plans': writer['plans'], 'rows': writer['rows'], 'batches': writer['batches']}
+
+# From a customer's perspective:
+# - Plans are written to the file in batches as they come, so a run of thousands of plans never holds them all in memory.
+# - CSV and Arrow files have one row per package to buy, which spreadsheets and data tools read directly.
+# - JSON lines have one plan per line, exactly as `python -m soda optimize` prints it.
+
+
+# Function to write a batch of plans as JSON lines, one plan per line
+def _write_jsonl_batch(writer, plans):
+    writer['file'].write(''.join(json.dumps(plan.to_dict()) + '\n' for plan in plans))
+    return len(plans)
+
+
+# Function to write a batch of plans as CSV rows
+def _write_csv_batch(writer, plans):
+    rows = [row for plan in plans for row in plan_rows(plan)]
+    writer['csv'].writerows(rows)
+    return len(rows)
+
+
+# Function to write a batch of plans as one Arrow record batch
+def _write_arrow_batch(writer, plans):
+    import pyarrow as pa
+
+    rows = [row for plan in plans for row in plan_rows(plan)]
+    columns = {column: [row[column] for row in rows] for column in PLAN_COLUMNS}
+    writer['arrow'].write_batch(pa.RecordBatch.from_pydict(columns, schema=writer['schema']))
+    return len(rows)
+
+
+# Function to write a batch of plans as text reports
+def _write_text_batch(writer, plans):
+    # A blank line after every report keeps the plans apart
+    writer['file'].write(''.join(render_plan_text(plan, writer['cost_table'], writer['package_rows']) + '\n' for plan in plans))
+    return len(plans)
+
+
+# One batch writer per output format
+_BATCH_WRITERS = {'csv': _write_csv_batch, 'jsonl': _write_jsonl_batch, 'arrow': _write_arrow_batch, 'text': _write_text_batch}
+
+
+# Function to stream any number of plans to a file
+def write_plans(plans, path, format=None, batch_size=1000, cost_table=None):
+    writer = open_plan_writer(path, format=format, batch_size=batch_size, cost_table=cost_table)
+    try:
+        for plan in plans:
+            write_plan(writer, plan)
+    finally:
+        summary = close_plan_writer(writer)
+    return summary
+
+
+# Function to solve many quantities and stream their plans to a file, one batch of quantities at a time
+def write_optimal_shopping_plans(quantities, path, format=None, batch_size=1000, radius_miles=None, k_nearest=None, home=None,
+                                 **options):
+    quantities = iter(quantities)
+    cost_table = get_cost_table(radius_miles, k_nearest, home)
+    writer = open_plan_writer(path, format=format, batch_size=batch_size, cost_table=cost_table)
+    try:
+        while True:
+            batch = [n for _, n in zip(range(batch_size), quantities)]
+            if not batch:
+                break
+            # Only this batch of plans is ever held in memory
+            for plan in get_optimal_shopping_plans(batch, radius_miles=radius_miles, k_nearest=k_nearest, home=home, **options):
+                write_plan(writer, plan)
+    finally:
+        summary = close_plan_writer(writer)
+    return summary
+
+# From a customer's perspective:
+# - write_optimal_shopping_plans(range(1, 100001), 'plans.csv') plans 100,000 quantities and saves them without running out of memory.
+# - The file type picks the format: .csv, .jsonl, .arrow (needs pyarrow) or .txt for the readable report.